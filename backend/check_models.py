@@ -1,25 +1,100 @@
 import os
-import google.generativeai as genai
+import sys
+import asyncio
+import argparse
 from dotenv import load_dotenv
 
-# Load your API key
-load_dotenv(".env")
-api_key = os.getenv("GOOGLE_API_KEY")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from model_health import ModelHealth
+from model_probe import list_catalog, pick_candidates, probe, write_manifest
+from page_cache import DEFAULT_CACHE_DIR
+
+
+def list_gemini_models(api_key):
+    # Imported here: google.generativeai takes seconds to load
+    import google.generativeai as genai
 
-if not api_key:
-    print("❌ Error: GOOGLE_API_KEY not found in .env")
-else:
-    print(f"✅ Key found: {api_key[:5]}...")
-    
-    # Configure the library
     genai.configure(api_key=api_key)
+    # Ask Google for the list; keep the exact names we need
+    return [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
+
+
+async def check(args):
+    from openai import AsyncOpenAI
+
+    client = AsyncOpenAI(
+        base_url=args.base_url,
+        api_key=os.getenv("OPENROUTER_API_KEY") or "none",  # the catalog is public; probes need a key
+    )
+    google_key = os.getenv("GOOGLE_API_KEY")
+    if google_key:
+        print(f"✅ Google key found: {google_key[:5]}...")
+    else:
+        print("⚠️  GOOGLE_API_KEY not found in .env, skipping Gemini")
+
+    # Both catalogs at once
+    print("\nListing model catalogs...")
+    gemini, catalog = await asyncio.gather(
+        asyncio.to_thread(list_gemini_models, google_key) if google_key else asyncio.sleep(0, None),
+        list_catalog(client),
+        return_exceptions=True,
+    )
+    if isinstance(gemini, Exception):
+        print(f"❌ Error connecting to Google: {gemini}")
+    elif gemini:
+        for name in gemini:
+            print(f"FOUND MODEL: {name}")
+    if isinstance(catalog, Exception):
+        print(f"❌ Error fetching OpenRouter catalog: {catalog}")
+        catalog = None
+    else:
+        print(f"✅ OpenRouter serves {len(catalog)} models")
+        # The scraper skips any model ID that isn't in this catalog
+        health = ModelHealth(os.path.join(args.cache_dir, "model_health.json"))
+        health.seed_catalog(catalog)
+        health.save()
+        print("✅ Seeded the scraper's model health table with the catalog")
+
+    if args.seed_health:
+        return
+    if not os.getenv("OPENROUTER_API_KEY"):
+        print("❌ Error: OPENROUTER_API_KEY not found in .env, can't probe")
+        return
+
+    if args.candidates:
+        candidates = [m.strip() for m in args.candidates.split(",") if m.strip()]
+    else:
+        candidates = pick_candidates(catalog, limit=args.max_models)
+    print(f"\nProbing {len(candidates)} models, {args.concurrency} at a time...")
+    manifest = await probe(client, candidates, catalog, args.concurrency, args.timeout, args.ttl_hours)
+    print(f"{'model':<48}{'status':>7}{'ttft s':>10}{'tok/s':>12}{'json':>6}")
+    for row in manifest["models"]:
+        print(f"{row['id']:<48}{row['status']:>7}{str(row['ttft'] or '-'):>10}"
+              f"{str(row['tokens_per_sec'] or '-'):>12}{'yes' if row['json_mode'] else 'no':>6}")
+    write_manifest(args.manifest, manifest)
+    print(f"\n✅ {len(manifest['ranked'])} working models written to {args.manifest} "
+          f"(fresh for {args.ttl_hours:g}h)")
+
+
+def main(argv=None):
+    # Load your API keys
+    load_dotenv(".env")
+    cache_dir = os.getenv("SCRAPER_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+    parser = argparse.ArgumentParser(description="List model catalogs and probe which models work, and how fast")
+    parser.add_argument("--seed-health", action="store_true",
+                        help="only store OpenRouter's model catalog in the scraper's model health table")
+    parser.add_argument("--candidates", help="comma-separated model IDs to probe (default: preferred + free models)")
+    parser.add_argument("--max-models", type=int, default=12, help="probe at most this many catalog models")
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--timeout", type=float, default=30, help="seconds per probe completion")
+    parser.add_argument("--ttl-hours", type=float, default=float(os.getenv("SCRAPER_MODEL_MANIFEST_TTL_HOURS", "24")))
+    parser.add_argument("--manifest", default=os.path.join(cache_dir, "models.json"))
+    parser.add_argument("--base-url", default=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"))
+    args = parser.parse_args(argv)
+    args.cache_dir = cache_dir
+    asyncio.run(check(args))
+
 
-    print("\nAttempting to list models...")
-    try:
-        # Ask Google for the list
-        for m in genai.list_models():
-            if 'generateContent' in m.supported_generation_methods:
-                # Print the exact name we need
-                print(f"FOUND MODEL: {m.name}")
-    except Exception as e:
-        print(f"❌ Error connecting to Google: {e}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Scraper scripts; `python -m scripts --help` from backend/ lists the commands (see cli.py)."""
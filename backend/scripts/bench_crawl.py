@@ -0,0 +1,447 @@
+"""Benchmark the whole crawl pipeline offline.
+
+    python scripts/bench_crawl.py [--targets N] [--llm-latency S] [--llm-429 P]
+                                  [--llm-malformed P] [--llm-bad-items P] [--json out.json]
+
+Two local stand-ins replace the internet:
+
+- a fixture server that replays the saved pages in fixtures/html (each
+  target gets its own URL and a marker line, so pages and prompts differ);
+- a fake OpenAI-compatible /chat/completions endpoint that streams MCQ
+  arrays, with configurable time to first byte, a share of 429 responses,
+  a share of malformed (unparseable) completions and a share of invalid
+  items (answer not among the options) inside otherwise good ones.
+
+scraper.main() runs in a child process pointed at both, with a throwaway
+cache dir and no MongoDB, so its peak RSS is the pipeline's alone. The
+child times get_website_text (fetch), get_questions_for_page (extract),
+get_packed_questions (packed, with --pack), get_questions_safe (llm) and
+stream_questions (stream), and reports
+targets/min, p50/p95 per stage, LLM requests per target and peak RSS.
+extract_json and MCQStreamParser are timed separately on the fake's
+completions.
+
+--probe instead runs check_models.py's concurrent model probe against the
+fake endpoint (its /models catalog, a missing model and one that rejects
+JSON mode) and prints the manifest it would write.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import glob
+import hashlib
+import io
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+WORDS = (
+    "array tree graph heap stack queue cache index shard lock thread process kernel socket "
+    "packet router latency buffer pointer closure promise schema query join commit rollback "
+    "replica leader follower quorum hash bloom filter sort merge split token lexer parser "
+    "compiler linker module package bundle render virtual memory paging syscall mutex "
+    "semaphore deadlock monitor channel actor stream batch window offset cursor"
+).split()
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))], 4)
+
+
+def fake_questions(seed, count, bad_items=0.0):
+    """Deterministic MCQs whose wording differs per prompt, so dedup keeps them"""
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        words = rng.sample(WORDS, 8)
+        options = [" ".join(rng.sample(WORDS, 2)) for _ in range(4)]
+        answer = "none of these" if rng.random() < bad_items else options[0]
+        questions.append({"question": f"Which {' '.join(words)}?", "options": options, "answer": answer})
+    return questions
+
+
+# --- local stand-ins (run in the parent process) ---
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages, latency=0.0):
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+        self.pages = pages
+        self.latency = latency
+        self.requests = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests += 1
+        match = re.fullmatch(r"/page/(\d+)", self.path)
+        if not match:
+            self.send_error(404)
+            return
+        i = int(match.group(1))
+        time.sleep(self.server.latency)
+        body = self.server.pages[i % len(self.server.pages)].replace(
+            b"<body>", f"<body><p>Benchmark page {i}</p>".encode(), 1
+        )
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Streams chat completions like OpenRouter; 429s and malformed output on demand"""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.5, rate_429=0.0, rate_malformed=0.0, bad_items=0.0, seed=0,
+                 models=None, no_json_mode=()):
+        super().__init__(("127.0.0.1", 0), FakeLLMHandler)
+        self.models = models  # served model IDs for /models; others get a 404 (None: serve anything)
+        self.no_json_mode = set(no_json_mode)  # models that answer response_format with a 400
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.rate_malformed = rate_malformed
+        self.bad_items = bad_items
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = {"ok": 0, "429": 0, "malformed": 0}
+        self.completions = []  # response bodies, for the parser timings
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/v1"
+
+    def roll(self):
+        with self.lock:
+            r = self.rng.random()
+        if r < self.rate_429:
+            return "429"
+        if r < self.rate_429 + self.rate_malformed:
+            return "malformed"
+        return "ok"
+
+    def count(self, outcome, text=None):
+        with self.lock:
+            self.counts[outcome] += 1
+            if text is not None:
+                self.completions.append(text)
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if not self.path.endswith("/models"):
+            return self.reply(404, {"error": {"message": "Not found", "code": 404}})
+        models = self.server.models or ["fake/model"]
+        self.reply(200, {"object": "list", "data": [{"id": m, "object": "model", "created": 0, "owned_by": "bench"}
+                                                    for m in models]})
+
+    def reply(self, status, payload, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = request.get("model", "fake")
+        if self.server.models is not None and model not in self.server.models:
+            return self.reply(404, {"error": {"message": f"No endpoints found for {model}", "code": 404}})
+        if "response_format" in request and model in self.server.no_json_mode:
+            return self.reply(400, {"error": {"message": "response_format is not supported", "code": 400}})
+        outcome = self.server.roll()
+        if outcome == "429":
+            self.server.count("429")
+            return self.reply(429, {"error": {"message": "Rate limit exceeded", "code": 429}}, [("Retry-After", "1")])
+
+        prompt = "".join(m.get("content", "") for m in request.get("messages", []))
+        match = re.search(r"(?:Extract|exactly) (\d+)", prompt)
+        count = int(match.group(1)) if match else 15
+        seed = hashlib.sha256(prompt.encode()).hexdigest()
+        sections = re.findall(r"^### (T\d+):", prompt, re.M)  # a packed prompt (scraper --pack)
+        if "response_format" in request:
+            text = json.dumps({"ok": True})  # a model_probe probe
+        elif outcome == "malformed":
+            text = "Sure! Here are the questions: [{question: 'oops', options: [A, B}, ...]"
+        elif sections:
+            text = json.dumps({s: fake_questions(seed + s, count, self.server.bad_items) for s in sections}, indent=2)
+        else:
+            text = json.dumps(fake_questions(seed, count, self.server.bad_items), indent=2)
+        self.server.count(outcome, text)
+
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for start in range(0, len(text), 64):
+            self.event({"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": model,
+                        "choices": [{"index": 0, "delta": {"content": text[start:start + 64]}, "finish_reason": None}]})
+        prompt_tokens, completion_tokens = len(prompt) // 4, len(text) // 4
+        self.event({"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": model, "choices": [],
+                    "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                              "total_tokens": prompt_tokens + completion_tokens}})
+        try:
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the scraper stops reading once it has enough questions
+
+    def event(self, payload):
+        try:
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+# --- the pipeline run (child process) ---
+
+def run_pipeline(args):
+    os.environ.update({
+        "OPENROUTER_API_KEY": "bench",
+        "OPENROUTER_BASE_URL": args.llm_url,
+        "MONGODB_URI": "",  # present but empty, so ../.env can't point the benchmark at a real DB
+        "SCRAPER_CACHE_DIR": args.cache_dir,
+        "SCRAPER_MODEL_RPM": str(args.model_rpm),
+        "SCRAPER_HOST_RPM": str(args.host_rpm),
+    })
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log if not args.verbose else sys.stderr):
+        import scraper
+
+    stage_times = {"fetch": [], "extract": [], "packed": [], "llm": [], "stream": []}
+    done = []
+
+    def timed(stage, fn):
+        async def wrapper(*a, **kw):
+            started = time.perf_counter()
+            try:
+                return await fn(*a, **kw)
+            finally:
+                stage_times[stage].append(time.perf_counter() - started)
+        return wrapper
+
+    # Module globals are looked up at call time, so wrapping them times every call
+    scraper.get_website_text = timed("fetch", scraper.get_website_text)
+    scraper.get_questions_safe = timed("llm", scraper.get_questions_safe)
+    scraper.stream_questions = timed("stream", scraper.stream_questions)
+
+    def counted(stage, fn):
+        timed_fn = timed(stage, fn)
+
+        async def wrapper(*a, **kw):
+            questions, model_id = await timed_fn(*a, **kw)
+            if questions:
+                done.append(len(questions))
+            return questions, model_id
+        return wrapper
+
+    scraper.get_questions_for_page = counted("extract", scraper.get_questions_for_page)
+    scraper.get_packed_questions = counted("packed", scraper.get_packed_questions)
+    targets_file = os.path.join(args.cache_dir, "targets.jsonl")
+    with open(targets_file, "w") as f:
+        for i in range(args.targets):
+            f.write(json.dumps({"company": f"Bench {i}", "profile": f"Role {i}", "url": f"{args.page_url}/page/{i}"}) + "\n")
+
+    sys.argv = ["scraper.py", "--no-cache", "--targets", targets_file]
+    if args.extractor:
+        sys.argv += ["--extractor", args.extractor]
+    if args.pack:
+        sys.argv.append("--pack")
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log if not args.verbose else sys.stderr):
+        asyncio.run(scraper.main())
+    elapsed = time.perf_counter() - started
+
+    return {
+        "targets": args.targets,
+        "completed": len(done),
+        "questions": sum(done),
+        "seconds": round(elapsed, 3),
+        "targets_per_min": round(args.targets / elapsed * 60, 1),
+        "stages": {
+            stage: {"calls": len(times), "p50": percentile(times, 50), "p95": percentile(times, 95)}
+            for stage, times in stage_times.items()
+        },
+        # ru_maxrss is KB on Linux, bytes on macOS
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1),
+    }
+
+
+def bench_parsers(completions, rounds=20):
+    """Seconds per completion for extract_json and chunked MCQStreamParser feeds"""
+    from json_stream import MCQStreamParser, extract_json
+
+    if not completions:
+        return {}
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in completions:
+            extract_json(text)
+    whole = (time.perf_counter() - started) / (rounds * len(completions))
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in completions:
+            parser = MCQStreamParser()
+            for i in range(0, len(text), 64):
+                parser.feed(text[i:i + 64])
+    streamed = (time.perf_counter() - started) / (rounds * len(completions))
+    return {
+        "completions": len(completions),
+        "extract_json_us": round(whole * 1e6, 1),
+        "stream_parser_us": round(streamed * 1e6, 1),
+    }
+
+
+def run_probe(args):
+    """check_models.py's probe against the fake endpoint: one model missing, one without JSON mode"""
+    served = ["fake/fast:free", "fake/no-json:free", "openrouter/auto"]
+    llm = FakeLLMServer(args.llm_latency, args.llm_429, seed=args.seed, models=served,
+                        no_json_mode=["fake/no-json:free"])
+    threading.Thread(target=llm.serve_forever, daemon=True).start()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import check_models
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-probe-") as cache_dir:
+            os.environ.update({"OPENROUTER_API_KEY": "bench", "GOOGLE_API_KEY": "", "SCRAPER_CACHE_DIR": cache_dir})
+            path = os.path.join(cache_dir, "models.json")
+            check_models.main(["--base-url", llm.url, "--manifest", path,
+                               "--candidates", ",".join(served + ["fake/missing:free"])])
+            with open(path) as f:
+                manifest = json.load(f)
+    finally:
+        llm.shutdown()
+    print(f"LLM requests: {llm.counts}")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper pipeline against local stand-ins")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--targets", type=int, default=24)
+    parser.add_argument("--page-latency", type=float, default=0.05, help="seconds per page fetch")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds to first streamed token")
+    parser.add_argument("--llm-429", type=float, default=0.0, help="share of completions answered with 429")
+    parser.add_argument("--llm-malformed", type=float, default=0.0, help="share of completions that don't parse")
+    parser.add_argument("--llm-bad-items", type=float, default=0.0, help="share of MCQs whose answer isn't an option")
+    # The live budgets would make the benchmark measure the rate limiter, not the pipeline
+    parser.add_argument("--model-rpm", type=float, default=6000)
+    parser.add_argument("--host-rpm", type=float, default=6000)
+    parser.add_argument("--extractor", help="HTML to text backend (default: the scraper's)")
+    parser.add_argument("--pack", action="store_true", help="run the scraper with --pack")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="show the scraper's own output")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--probe", action="store_true", help="run check_models.py's model probe instead of a crawl")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--page-url", help=argparse.SUPPRESS)
+    parser.add_argument("--llm-url", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_pipeline(args)))
+        return
+    if args.probe:
+        manifest = run_probe(args)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(manifest, f, indent=2)
+        return
+
+    pages = []
+    for path in sorted(glob.glob(os.path.join(args.fixtures, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    if not pages:
+        print(f"❌ No .html fixtures in {args.fixtures}")
+        sys.exit(1)
+
+    fixtures = FixtureServer(pages, args.page_latency)
+    llm = FakeLLMServer(args.llm_latency, args.llm_429, args.llm_malformed, args.llm_bad_items, args.seed)
+    for server in (fixtures, llm):
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-crawl-") as cache_dir:
+            argv = [sys.executable, os.path.abspath(__file__), "--child",
+                    "--page-url", fixtures.url, "--llm-url", llm.url, "--cache-dir", cache_dir,
+                    "--targets", str(args.targets), "--model-rpm", str(args.model_rpm),
+                    "--host-rpm", str(args.host_rpm)]
+            if args.extractor:
+                argv += ["--extractor", args.extractor]
+            if args.pack:
+                argv.append("--pack")
+            if args.verbose:
+                argv.append("--verbose")
+            out = subprocess.run(argv, capture_output=True, text=True)
+    finally:
+        fixtures.shutdown()
+        llm.shutdown()
+
+    if out.returncode != 0:
+        print(f"❌ Pipeline run failed:\n{out.stderr.strip()}")
+        sys.exit(1)
+    if args.verbose:
+        print(out.stderr)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    llm_requests = sum(llm.counts.values())
+    result["config"] = {
+        "page_latency": args.page_latency, "llm_latency": args.llm_latency, "llm_429": args.llm_429,
+        "llm_malformed": args.llm_malformed, "llm_bad_items": args.llm_bad_items, "pack": args.pack, "model_rpm": args.model_rpm, "host_rpm": args.host_rpm,
+        "fixtures": len(pages), "seed": args.seed,
+    }
+    result["page_requests"] = fixtures.requests
+    result["llm_requests"] = dict(llm.counts, total=llm_requests)
+    result["llm_calls_per_target"] = round(llm_requests / max(1, args.targets), 2)
+    result["parsers"] = bench_parsers(llm.completions)
+
+    print(f"\n{result['targets']} targets ({result['completed']} with questions) in {result['seconds']}s "
+          f"= {result['targets_per_min']} targets/min")
+    print(f"LLM requests: {result['llm_requests']} ({result['llm_calls_per_target']} per target), "
+          f"peak RSS {result['peak_rss_kb']} KB\n")
+    print(f"{'stage':<10}{'calls':>8}{'p50 s':>10}{'p95 s':>10}")
+    for stage, s in result["stages"].items():
+        print(f"{stage:<10}{s['calls']:>8}{str(s['p50']):>10}{str(s['p95']):>10}")
+    if result["parsers"]:
+        p = result["parsers"]
+        print(f"\nextract_json {p['extract_json_us']} µs, stream parser {p['stream_parser_us']} µs per completion")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark the HTML -> text backends over saved pages.
+
+    python scripts/bench_extract.py [--fixtures DIR] [--rounds N] [--json out.json]
+
+Each backend runs in its own child process so peak RSS (which includes the C
+parsers' allocations) isn't polluted by the others. Python-level peak memory
+comes from tracemalloc.
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from extractors import available_backends, get_extractor, DEFAULT_BUDGET
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+
+def load_pages(fixtures_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.html"))):
+        with open(path, "rb") as f:
+            pages.append(f.read())
+    return pages
+
+
+def run_backend(name, pages, rounds, budget):
+    _, extract = get_extractor(name)
+    extract(pages[0], budget)  # warm up imports
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    chars = 0
+    for _ in range(rounds):
+        for html in pages:
+            chars += len(extract(html, budget))
+    elapsed = time.perf_counter() - started
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "backend": name,
+        "pages": rounds * len(pages),
+        "seconds": round(elapsed, 4),
+        "pages_per_sec": round(rounds * len(pages) / elapsed, 1),
+        "avg_chars": chars // (rounds * len(pages)),
+        "py_peak_kb": py_peak // 1024,
+        # ru_maxrss is KB on Linux, bytes on macOS
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // (1024 if sys.platform == "darwin" else 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML extractor backends")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET)
+    parser.add_argument("--backends", nargs="*", help="default: every installed backend")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    pages = load_pages(args.fixtures)
+    if not pages:
+        print(f"❌ No .html fixtures in {args.fixtures}")
+        sys.exit(1)
+
+    if args.child:
+        print(json.dumps(run_backend(args.child, pages, args.rounds, args.budget)))
+        return
+
+    results = []
+    for name in args.backends or available_backends():
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", name,
+             "--fixtures", args.fixtures, "--rounds", str(args.rounds), "--budget", str(args.budget)],
+            capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            print(f"⚠️ {name} failed: {out.stderr.strip().splitlines()[-1] if out.stderr else out.returncode}")
+            continue
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"\n{len(pages)} fixture pages x {args.rounds} rounds, budget {args.budget} chars\n")
+    print(f"{'backend':<12}{'pages/s':>10}{'avg chars':>11}{'py peak KB':>12}{'max RSS KB':>12}")
+    for r in results:
+        print(f"{r['backend']:<12}{r['pages_per_sec']:>10}{r['avg_chars']:>11}{r['py_peak_kb']:>12}{r['max_rss_kb']:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""Compact, indexed export of the question bank.
+
+A bundle replaces the old faang_questions.json dump. It holds one
+compressed block per (company, profile) document, so a consumer can read
+one company without decoding the rest:
+
+    offset 0   header: magic, codec, index offset, index length   (32 bytes)
+    32 ...     blocks: one zstd/gzip-compressed JSON document each
+    index      JSON list of {company, profile, offset, length, count, stamp}
+
+The reader maps the file with mmap and parses only the header and index up
+front; questions() decompresses just the blocks it is asked for. Blocks
+are zstd when the zstandard package is installed, gzip otherwise.
+
+Exports are incremental: each entry records a stamp (scraped_at and
+content_hash from Mongo, or a digest of the document), and a new export
+copies the compressed bytes of unchanged documents straight from the
+previous bundle, fetching and re-encoding only what changed. The new file
+is written next to the old one and swapped in with os.replace, so open
+readers keep their mapping.
+
+    python scripts/bundle.py export [--out ../data/questions.qb] [--from-json FILE] [--full]
+    python scripts/bundle.py show [--company Meta] [--profile ...]
+"""
+
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"QBUNDLE1"
+HEADER = struct.Struct("<8sB7xQQ")  # magic, codec, index offset, index length
+GZIP, ZSTD = 1, 2
+CODEC_NAMES = {GZIP: "gzip", ZSTD: "zstd"}
+DEFAULT_BUNDLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../data/questions.qb")
+
+# Fields kept from each mocktest_data document
+FIELDS = ("company", "profile", "questions", "source", "scraped_at", "model_used")
+
+
+def default_codec():
+    return ZSTD if zstandard is not None else GZIP
+
+
+def compress(codec, data):
+    if codec == ZSTD:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def decompress(codec, data):
+    if codec == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("this bundle is zstd-compressed; pip install zstandard to read it")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def encode(doc):
+    return json.dumps({k: doc.get(k) for k in FIELDS}, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def stamp_of(doc):
+    """What identifies this version of a document: Mongo's scrape stamp, or a digest"""
+    if doc.get("scraped_at"):
+        return f"{doc['scraped_at']}|{doc.get('content_hash') or ''}"
+    return hashlib.sha1(encode(doc)).hexdigest()
+
+
+class Bundle:
+    """Read-only view of a bundle file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.codec, index_offset, index_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a question bundle")
+        self.entries = json.loads(self._map[index_offset:index_offset + index_length])
+        self._by_key = {(e["company"], e["profile"]): e for e in self.entries}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def companies(self):
+        return sorted({e["company"] for e in self.entries})
+
+    def profiles(self, company):
+        return [e["profile"] for e in self.entries if e["company"] == company]
+
+    def raw_block(self, entry):
+        return self._map[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def document(self, company, profile):
+        entry = self._by_key.get((company, profile))
+        if entry is None:
+            return None
+        return json.loads(decompress(self.codec, self.raw_block(entry)))
+
+    def questions(self, company, profile=None):
+        """The questions of one company (or one of its profiles), decoding only those blocks"""
+        profiles = [profile] if profile is not None else self.profiles(company)
+        questions = []
+        for name in profiles:
+            doc = self.document(company, name)
+            if doc:
+                questions.extend(doc.get("questions") or [])
+        return questions
+
+
+def write_bundle(path, docs, stamps=None, codec=None, previous=None):
+    """Write a bundle of every key in `stamps`, reusing unchanged blocks from `previous`.
+
+    docs: {(company, profile): doc} for the changed documents; stamps:
+    {(company, profile): stamp} for all of them (default: stamps of docs).
+    Returns {"reused", "encoded"} counts.
+    """
+    codec = codec or default_codec()
+    stamps = stamps if stamps is not None else {key: stamp_of(doc) for key, doc in docs.items()}
+    old = {}
+    if previous is not None and previous.codec == codec:
+        old = previous._by_key
+    counts = {"reused": 0, "encoded": 0}
+    entries = []
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, codec, 0, 0))
+        for key in sorted(stamps):
+            prior = old.get(key)
+            if prior is not None and prior["stamp"] == stamps[key] and key not in docs:
+                block, count = previous.raw_block(prior), prior["count"]
+                counts["reused"] += 1
+            else:
+                doc = docs[key]
+                block, count = compress(codec, encode(doc)), len(doc.get("questions") or [])
+                counts["encoded"] += 1
+            entries.append({
+                "company": key[0], "profile": key[1], "offset": f.tell(), "length": len(block),
+                "count": count, "stamp": stamps[key],
+            })
+            f.write(block)
+        index = json.dumps(entries, ensure_ascii=False, separators=(",", ":")).encode()
+        index_offset = f.tell()
+        f.write(index)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, codec, index_offset, len(index)))
+    os.replace(tmp, path)
+    return counts
+
+
+def open_previous(path):
+    try:
+        return Bundle(path)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def export_collection(collection, path, full=False, codec=None):
+    """Export mocktest_data, fetching only documents whose stamp changed since the last bundle"""
+    codec = codec or default_codec()
+    previous = None if full else open_previous(path)
+    try:
+        listing = collection.find({}, {"_id": 0, "company": 1, "profile": 1, "scraped_at": 1, "content_hash": 1})
+        stamps = {}
+        for doc in listing:
+            key = (doc["company"], doc.get("profile"))
+            stamps[key] = stamp_of(doc) if doc.get("scraped_at") else None  # no stamp: digest after fetching
+        old = previous._by_key if previous is not None and previous.codec == codec else {}
+        missing = {key for key, stamp in stamps.items() if stamp is None or key not in old or old[key]["stamp"] != stamp}
+        docs = {}
+        for company in sorted({company for company, _ in missing}):
+            for doc in collection.find({"company": company}, {"_id": 0}):
+                key = (doc["company"], doc.get("profile"))
+                if key in missing:
+                    stamps[key] = stamp_of(doc)
+                    if key not in old or old[key]["stamp"] != stamps[key]:
+                        docs[key] = doc
+        counts = write_bundle(path, docs, stamps, codec, previous)
+    finally:
+        if previous is not None:
+            previous.close()
+    counts["dropped"] = len(set(old) - set(stamps))
+    return counts
+
+
+def export_documents(documents, path, full=False, codec=None):
+    """Export an iterable of documents (e.g. the legacy JSON dump); unchanged ones are copied"""
+    codec = codec or default_codec()
+    previous = None if full else open_previous(path)
+    try:
+        docs = {(d["company"], d.get("profile")): d for d in documents}
+        stamps = {key: stamp_of(doc) for key, doc in docs.items()}
+        old = previous._by_key if previous is not None and previous.codec == codec else {}
+        changed = {key: doc for key, doc in docs.items() if key not in old or old[key]["stamp"] != stamps[key]}
+        counts = write_bundle(path, changed, stamps, codec, previous)
+    finally:
+        if previous is not None:
+            previous.close()
+    counts["dropped"] = len(set(old) - set(stamps))
+    return counts
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export or inspect the question bank bundle")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="write mocktest_data (or a JSON dump) as a bundle")
+    export.add_argument("--out", default=os.getenv("SCRAPER_BUNDLE", DEFAULT_BUNDLE))
+    export.add_argument("--from-json", help="read documents from this JSON array instead of Mongo")
+    export.add_argument("--full", action="store_true", help="re-encode everything instead of reusing blocks")
+    export.add_argument("--codec", choices=["zstd", "gzip"], help="default: zstd when zstandard is installed")
+    show = sub.add_parser("show", help="list a bundle, or print one company's questions")
+    show.add_argument("--bundle", default=os.getenv("SCRAPER_BUNDLE", DEFAULT_BUNDLE))
+    show.add_argument("--company")
+    show.add_argument("--profile")
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        with Bundle(args.bundle) as bundle:
+            if args.company:
+                print(json.dumps(bundle.questions(args.company, args.profile), indent=2, ensure_ascii=False))
+                return
+            for entry in bundle.entries:
+                print(f"{entry['company']:<20} {entry['profile']:<30} {entry['count']:>4} Qs  {entry['length']:>8} B")
+            print(f"📦 {len(bundle.entries)} documents, {CODEC_NAMES[bundle.codec]}, "
+                  f"{os.path.getsize(args.bundle)} bytes")
+        return
+
+    codec = {"zstd": ZSTD, "gzip": GZIP}.get(args.codec)
+    if codec == ZSTD and zstandard is None:
+        parser.error("--codec zstd needs the zstandard package")
+    if args.from_json:
+        with open(args.from_json) as f:
+            counts = export_documents(json.load(f), args.out, args.full, codec)
+    else:
+        from dotenv import load_dotenv
+        from pymongo import MongoClient
+
+        load_dotenv(os.path.join(os.path.dirname(__file__), '../.env'))
+        if not os.getenv("MONGODB_URI"):
+            parser.error("MONGODB_URI is not set; use --from-json to export a file")
+        collection = MongoClient(os.getenv("MONGODB_URI"))["brainwave"]["mocktest_data"]
+        counts = export_collection(collection, args.out, args.full, codec)
+    print(f"✅ Exported to {args.out}: {counts['encoded']} re-encoded, {counts['reused']} reused, "
+          f"{counts['dropped']} dropped ({os.path.getsize(args.out)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
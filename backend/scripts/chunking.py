@@ -0,0 +1,79 @@
+"""Split long pages into prompt-sized windows and merge the MCQs they produce.
+
+A page is cut on heading-like lines and line (paragraph) boundaries into
+windows of at most CHUNK_TOKENS (estimated at ~4 characters per token). Each
+window is sent to a model on its own, and the per-window MCQ lists are merged
+round-robin, dropping repeated questions, so the final set draws from the
+whole page rather than only its opening section.
+"""
+
+import re
+
+CHARS_PER_TOKEN = 4
+
+_HEADING = re.compile(
+    r"^(#{1,6}\s"                      # markdown heading
+    r"|(Q|Question)\s*\d+\s*[.:)-]"    # Q1. / Question 12:
+    r"|\d{1,3}[.)]\s"                  # 1. / 12)
+    r"|.{1,200}\?$)"                   # a line that is itself a question
+)
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def is_heading(line):
+    return bool(_HEADING.match(line.strip()))
+
+
+def split_chunks(text, max_tokens=2000, max_chunks=None):
+    """Greedy windows of whole lines, preferring to break before headings"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    size = 0
+
+    def close():
+        nonlocal current, size
+        if current:
+            chunks.append("\n".join(current))
+        current, size = [], 0
+
+    for line in text.splitlines():
+        # A single overlong line (minified page) is hard-split
+        while len(line) > max_chars:
+            close()
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and (size + len(line) + 1 > max_chars or (is_heading(line) and size > max_chars * 3 // 4)):
+            close()
+        current.append(line)
+        size += len(line) + 1
+    close()
+
+    if max_chunks:
+        chunks = chunks[:max_chunks]
+    return chunks
+
+
+def normalize_question(text):
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", str(text).lower()).split())
+
+
+def merge_questions(per_chunk, limit):
+    """Round-robin across chunks so every part of the page is represented; drop repeats"""
+    merged = []
+    seen = set()
+    queues = [list(qs or []) for qs in per_chunk]
+    while len(merged) < limit and any(queues):
+        for queue in queues:
+            if not queue or len(merged) >= limit:
+                continue
+            q = queue.pop(0)
+            key = normalize_question(q.get("question", "")) if isinstance(q, dict) else None
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            merged.append(q)
+    return merged
@@ -0,0 +1,155 @@
+"""One entry point for the scraper scripts.
+
+    python -m scripts crawl [scraper options]     # same as python scripts/scraper.py
+    python -m scripts check-models [--seed-health]
+    python -m scripts status [--check]            # what is due, from local state only
+    python -m scripts importtime [--budget-ms 400]
+    python -m scripts export [--out FILE] [--from-json FILE] [--full]
+    python -m scripts embed build|search ...      # see embeddings.py
+
+Run from backend/. Subcommands import only what they need, so `status` and
+`importtime` never load openai, httpx or pymongo. `status --check` exits
+with 1 when nothing is due, for cron lines like
+
+    python -m scripts status --check -q && python -m scripts crawl
+
+`importtime` imports each module in a fresh interpreter under
+-X importtime and fails when its cold import takes longer than the budget.
+test_importtime.py runs the same check with the test suite.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(SCRIPTS_DIR)
+# The scripts import each other by plain module name, check_models lives in backend/
+for path in (SCRIPTS_DIR, BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+IMPORT_BUDGET_MS = float(os.getenv("SCRAPER_IMPORT_BUDGET_MS", "400"))
+IMPORT_MODULES = ["scraper", "check_models"]
+
+
+def crawl(argv):
+    import asyncio
+    import scraper
+
+    asyncio.run(scraper.main(argv))
+
+
+def check_models(argv):
+    import check_models
+
+    check_models.main(argv)
+
+
+def export(argv):
+    import bundle
+
+    bundle.main(["export", *argv])
+
+
+def embed(argv):
+    import embeddings
+
+    embeddings.main(argv)
+
+
+def status(argv):
+    parser = argparse.ArgumentParser(description="Show what the next crawl would pick up")
+    parser.add_argument("--targets", help="targets .jsonl/.yaml file (default: SCRAPER_TARGETS or targets.jsonl)")
+    parser.add_argument("--check", action="store_true", help="exit with 1 when no target is due")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only set the exit status")
+    args = parser.parse_args(argv)
+
+    import scraper
+    from registry import Registry
+
+    if args.targets == "mongo":
+        parser.error("status reads local state only; use a targets file")
+    registry = Registry(args.targets or os.getenv("SCRAPER_TARGETS"), default_refresh_days=scraper.REFRESH_DAYS)
+    # Local checkpoints only: Mongo may still rule out targets another machine wrote
+    due = [
+        t for t in registry
+        if scraper.work_queue.is_due(scraper.work_queue.get((t["company"], t["profile"])), None,
+                                     t["refresh_days"] * 24 * 3600)
+    ]
+    if not args.quiet:
+        print(f"📚 Targets: {registry.read} read, {registry.matched} matched, {len(due)} due")
+        for target in sorted(due, key=lambda t: -t["priority"])[:20]:
+            print(f"   {target['priority']:>4}  {target['company']:<20} {target['profile']}")
+        if len(due) > 20:
+            print(f"   ... and {len(due) - 20} more")
+        print(f"📋 Work queue: {scraper.work_queue.summary()}")
+        print("🩺 Model health:")
+        for row in scraper.model_health.summary():
+            print(f"   {row['model']:<45} {row['state']:<9} p50={row['p50']} ok={row['ok_rate']}")
+    if args.check and not due:
+        sys.exit(1)
+
+
+def import_ms(module):
+    """Cumulative cold import time of `module` in a fresh interpreter, in ms"""
+    env = dict(os.environ, OPENROUTER_API_KEY=os.getenv("OPENROUTER_API_KEY") or "importtime")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPTS_DIR, env=dict(env, PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))),
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    for line in result.stderr.splitlines():
+        match = re.match(rf"import time:\s+\d+ \|\s+(\d+) \| {re.escape(module)}$", line)
+        if match:
+            return int(match.group(1)) / 1000
+    raise RuntimeError(f"no importtime line for {module}")
+
+
+def importtime(argv):
+    parser = argparse.ArgumentParser(description="Fail if a cold import is over budget")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("modules", nargs="*", default=IMPORT_MODULES)
+    args = parser.parse_args(argv)
+
+    over = []
+    for module in args.modules:
+        try:
+            ms = import_ms(module)
+        except RuntimeError as e:
+            print(f"❌ {module}: {e}")
+            over.append(module)
+            continue
+        ok = ms <= args.budget_ms
+        print(f"{'✅' if ok else '❌'} {module:<14} {ms:7.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if not ok:
+            over.append(module)
+    if over:
+        sys.exit(1)
+
+
+COMMANDS = {
+    "crawl": crawl,
+    "check-models": check_models,
+    "status": status,
+    "importtime": importtime,
+    "export": export,
+    "embed": embed,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.strip())
+        sys.exit(0 if argv and argv[0] in ("-h", "--help") else 2)
+    sys.argv[0] = f"python -m scripts {argv[0]}"  # for the subcommand's usage line
+    COMMANDS[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Near-duplicate MCQ detection with MinHash + LSH.
+
+Each question is normalized (lowercase, punctuation stripped, options sorted)
+and turned into word shingles. A MinHash signature of NUM_PERM values
+estimates Jaccard similarity between two questions, and LSH banding buckets
+signatures so a lookup only compares against the few stored questions that
+share a band instead of scanning all of them.
+
+The scraper builds the index from everything already in mocktest_data (once
+the first target of a run gets that far) and drops new questions that are near-duplicates of one stored for another
+(company, profile). Run this file directly to report (or remove) duplicates
+that are already in the collection or in a JSON export:
+
+    python scripts/dedup.py --json data/faang_questions.json
+    python scripts/dedup.py --mongo [--apply]
+"""
+
+import hashlib
+import re
+import struct
+
+NUM_PERM = 64
+BANDS = 16          # 16 bands x 4 rows: pairs above ~0.5 Jaccard usually collide
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.7     # estimated Jaccard at which two questions count as the same
+SHINGLE = 3
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutations():
+    # Fixed seeds so signatures stay comparable between runs
+    perms = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"perm-{i}".encode(), digest_size=16).digest()
+        a, b = struct.unpack("<QQ", digest)
+        perms.append((a % (_MERSENNE - 1) + 1, b % _MERSENNE))
+    return perms
+
+
+_PERMS = _permutations()
+
+
+def normalize(question):
+    text = question.get("question", "") if isinstance(question, dict) else str(question)
+    options = question.get("options", []) if isinstance(question, dict) else []
+    if not isinstance(options, list):
+        options = [options]
+    parts = [str(text)] + sorted(str(o) for o in options)
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", " ".join(parts).lower()).split())
+
+
+def shingles(text, k=SHINGLE):
+    words = text.split()
+    if len(words) <= k:
+        return {text} if text else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def signature(question):
+    hashes = [
+        struct.unpack("<I", hashlib.blake2b(s.encode(), digest_size=4).digest())[0]
+        for s in shingles(normalize(question))
+    ]
+    if not hashes:
+        return None
+    return tuple(min((a * h + b) % _MERSENNE & _MAX_HASH for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+class DedupIndex:
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+        self.signatures = []   # item id -> signature
+        self.owners = []       # item id -> (company, profile)
+        self.buckets = {}      # (band, band hash) -> [item ids]
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _bands(self, sig):
+        for band in range(BANDS):
+            yield band, sig[band * ROWS:(band + 1) * ROWS]
+
+    def add(self, sig, owner):
+        item = len(self.signatures)
+        self.signatures.append(sig)
+        self.owners.append(owner)
+        for key in self._bands(sig):
+            self.buckets.setdefault(key, []).append(item)
+        return item
+
+    def find(self, sig, ignore_owner=None, since=None):
+        """Best stored match at or above the threshold as (item id, similarity), or None.
+
+        Items of ignore_owner are skipped, except ones added at or after item id since.
+        """
+        best = None
+        seen = set()
+        since = len(self.signatures) if since is None else since
+        for key in self._bands(sig):
+            for item in self.buckets.get(key, ()):
+                if item in seen or (self.owners[item] == ignore_owner and item < since):
+                    continue
+                seen.add(item)
+                score = similarity(sig, self.signatures[item])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (item, score)
+        return best
+
+    def filter_new(self, questions, owner):
+        """Keep questions that aren't near-duplicates of stored ones (or of each other).
+
+        The owner's own stored questions are ignored because the upsert replaces
+        them. Kept questions are added to the index straight away so targets
+        processed concurrently see each other's output.
+        """
+        kept = []
+        start = len(self.signatures)
+        for q in questions:
+            sig = signature(q)
+            if sig is None or self.find(sig, ignore_owner=owner, since=start):
+                continue
+            self.add(sig, owner)
+            kept.append(q)
+        return kept
+
+    def add_document(self, doc):
+        owner = (doc.get("company"), doc.get("profile"))
+        for q in doc.get("questions") or []:
+            sig = signature(q)
+            if sig is not None:
+                self.add(sig, owner)
+
+
+def build_index(documents, threshold=THRESHOLD):
+    index = DedupIndex(threshold)
+    for doc in documents:
+        index.add_document(doc)
+    return index
+
+
+def find_duplicates(documents, threshold=THRESHOLD):
+    """Walk documents in order; returns {doc position: [question positions to drop]}"""
+    index = DedupIndex(threshold)
+    drops = {}
+    for d, doc in enumerate(documents):
+        owner = (doc.get("company"), doc.get("profile"))
+        questions = doc.get("questions") or []
+        if not isinstance(questions, list):
+            continue
+        for q_pos, q in enumerate(questions):
+            sig = signature(q)
+            if sig is None:
+                continue
+            if index.find(sig):
+                drops.setdefault(d, []).append(q_pos)
+            else:
+                index.add(sig, owner)
+    return drops
+
+
+def main():
+    import argparse
+    import json
+    import os
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate MCQs")
+    parser.add_argument("--json", help="question bank JSON export to check")
+    parser.add_argument("--mongo", action="store_true", help="check the mocktest_data collection")
+    parser.add_argument("--apply", action="store_true", help="with --mongo: remove the duplicates")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    if args.json:
+        with open(args.json) as f:
+            documents = json.load(f)
+        collection = None
+    elif args.mongo:
+        from dotenv import load_dotenv
+        from pymongo import MongoClient, UpdateOne
+
+        load_dotenv(os.path.join(os.path.dirname(__file__), '../.env'))
+        collection = MongoClient(os.getenv("MONGODB_URI"))["brainwave"]["mocktest_data"]
+        documents = list(collection.find({}, {"company": 1, "profile": 1, "questions": 1}).sort("scraped_at", 1))
+    else:
+        parser.error("pass --json FILE or --mongo")
+
+    drops = find_duplicates(documents, args.threshold)
+    total = sum(len(doc["questions"]) for doc in documents if isinstance(doc.get("questions"), list))
+    dupes = sum(len(v) for v in drops.values())
+    print(f"🔎 {dupes} near-duplicates out of {total} questions in {len(documents)} documents")
+    for d, positions in drops.items():
+        print(f"   {documents[d].get('company')} / {documents[d].get('profile')}: {len(positions)}")
+
+    if args.apply and collection is not None and drops:
+        ops = []
+        for d, positions in drops.items():
+            doc = documents[d]
+            drop = set(positions)
+            kept = [q for i, q in enumerate(doc["questions"]) if i not in drop]
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"questions": kept}}))
+        collection.bulk_write(ops, ordered=False)
+        print(f"✅ Removed {dupes} duplicates from {len(ops)} documents")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Question embeddings and a memory-mapped similarity index.
+
+Embedders turn a list of texts into an (n, dim) float32 array of unit
+vectors, one batch per call:
+
+- "hash" (default): feature hashing of words and word pairs. Offline,
+  deterministic and free; good enough for near-duplicate and topic lookups.
+- "sentence-transformers:MODEL": a local model (needs sentence-transformers).
+- "openai:MODEL": any OpenAI-compatible /embeddings endpoint, configured by
+  SCRAPER_EMBED_BASE_URL / SCRAPER_EMBED_API_KEY.
+
+EmbeddingIndex keeps the vectors as raw float32 rows in vectors.f32 (read
+through np.memmap, grown by appending), one JSON line per row in meta.jsonl
+and the row count, dimension and embedder in index.json. Rows are written
+before the count is bumped, so a crash leaves at most some ignored tail
+bytes. Search is one matrix-vector product and an argpartition over the
+mapped rows.
+
+The scraper's --embed stage feeds new questions through EmbeddingBatcher,
+which embeds them in large batches off the event loop (like BufferedWriter,
+by size, with a final flush).
+
+    python scripts/embeddings.py build [--bundle FILE | --from-json FILE]
+    python scripts/embeddings.py search "consistent hashing" [-k 5] [--company Meta]
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+DEFAULT_EMBEDDER = "hash"
+HASH_DIM = 256
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def question_id(company, profile, question):
+    text = " ".join(str(question).split()).lower()
+    return hashlib.sha1(f"{company}\0{profile}\0{text}".encode()).hexdigest()[:16]
+
+
+def question_text(q):
+    """What gets embedded for an MCQ: the stem plus its options"""
+    return " ".join([q.get("question") or "", *map(str, q.get("options") or [])])
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class HashEmbedder:
+    """Signed feature hashing of unigrams and bigrams (offline stub)"""
+
+    def __init__(self, dim=HASH_DIM):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+
+    def embed(self, texts):
+        rows, cols, signs = [], [], []
+        for row, text in enumerate(texts):
+            words = _WORD.findall(text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode())
+                rows.append(row)
+                cols.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)),
+                  np.array(signs, dtype=np.float32))
+        return _normalize(vectors)
+
+
+class SentenceTransformerEmbedder:
+    def __init__(self, model, batch_size=256):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{model}"
+        self.batch_size = batch_size
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class OpenAIEmbedder:
+    """An OpenAI-compatible embeddings endpoint; dim is requested via `dimensions`"""
+
+    def __init__(self, model, dim=None, batch_size=512):
+        from openai import OpenAI
+
+        self.client = OpenAI(
+            base_url=os.getenv("SCRAPER_EMBED_BASE_URL", "https://api.openai.com/v1"),
+            api_key=os.getenv("SCRAPER_EMBED_API_KEY") or os.getenv("OPENAI_API_KEY"),
+        )
+        self.model = model
+        self.dim = dim or int(os.getenv("SCRAPER_EMBED_DIM", "256"))
+        self.name = f"openai:{model}"
+        self.batch_size = batch_size
+
+    def embed(self, texts):
+        texts = list(texts)
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            response = self.client.embeddings.create(
+                model=self.model, input=texts[start:start + self.batch_size], dimensions=self.dim
+            )
+            vectors.extend(item.embedding for item in sorted(response.data, key=lambda d: d.index))
+        return _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim))
+
+
+def get_embedder(spec=None):
+    spec = spec or os.getenv("SCRAPER_EMBEDDER", DEFAULT_EMBEDDER)
+    kind, _, model = spec.partition(":")
+    if kind == "hash":
+        return HashEmbedder(int(model) if model else HASH_DIM)
+    if kind == "sentence-transformers":
+        return SentenceTransformerEmbedder(model or "all-MiniLM-L6-v2")
+    if kind == "openai":
+        return OpenAIEmbedder(model or "text-embedding-3-small")
+    raise ValueError(f"unknown embedder {spec!r} (hash[:DIM], sentence-transformers:MODEL, openai:MODEL)")
+
+
+class EmbeddingIndex:
+    def __init__(self, root, dim, embedder_name):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.header_path = os.path.join(root, "index.json")
+        self.vectors_path = os.path.join(root, "vectors.f32")
+        self.meta_path = os.path.join(root, "meta.jsonl")
+        self.dim = dim
+        self.embedder_name = embedder_name
+        self.count = 0
+        if os.path.exists(self.header_path):
+            with open(self.header_path) as f:
+                header = json.load(f)
+            if (header["dim"], header["embedder"]) != (dim, embedder_name):
+                raise ValueError(
+                    f"{root} holds {header['embedder']} vectors (dim {header['dim']}); "
+                    f"use another directory or rebuild for {embedder_name}"
+                )
+            self.count = header["count"]
+        self.meta = []
+        if self.count:
+            with open(self.meta_path) as f:
+                for line in f:
+                    if len(self.meta) == self.count:
+                        break
+                    self.meta.append(json.loads(line))
+        self.ids = {m["id"] for m in self.meta}
+        self._companies = {}
+        self._company_codes = np.array([self._code(m["company"]) for m in self.meta], dtype=np.int32)
+        self._map = None
+        self._truncate_tails()
+
+    def __len__(self):
+        return self.count
+
+    def _code(self, company):
+        return self._companies.setdefault(company, len(self._companies))
+
+    def _truncate_tails(self):
+        """Drop rows written by an append that crashed before bumping the count"""
+        for path, size in ((self.vectors_path, self.count * self.dim * 4), (self.meta_path, None)):
+            if not os.path.exists(path):
+                continue
+            if size is None:
+                with open(path, "rb") as f:
+                    size = sum(len(f.readline()) for _ in range(self.count))
+            if os.path.getsize(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def vectors(self):
+        """The (count, dim) float32 rows, memory-mapped read-only"""
+        if not self.count:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if self._map is None or self._map.shape[0] != self.count:
+            self._map = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+        return self._map
+
+    def append(self, vectors, metas):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(metas), self.dim):
+            raise ValueError(f"expected {len(metas)} x {self.dim} vectors, got {vectors.shape}")
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self.meta_path, "a") as f:
+            for meta in metas:
+                f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+        self.meta.extend(metas)
+        self.ids.update(m["id"] for m in metas)
+        codes = np.array([self._code(m["company"]) for m in metas], dtype=np.int32)
+        self._company_codes = np.concatenate([self._company_codes, codes])
+        self.count += len(metas)
+        tmp = f"{self.header_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "embedder": self.embedder_name, "count": self.count}, f)
+        os.replace(tmp, self.header_path)
+
+    def search(self, query, k=10, company=None, exclude=None):
+        """[(score, meta)] for the k rows most similar (cosine) to a unit query vector"""
+        scores = self.vectors() @ np.asarray(query, dtype=np.float32).reshape(self.dim)
+        if company is not None:
+            code = self._companies.get(company)
+            if code is None:
+                return []
+            scores = np.where(self._company_codes == code, scores, -np.inf)
+        if exclude is not None:
+            scores = np.array(scores)  # don't write into the mapping
+            scores[exclude] = -np.inf
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), self.meta[i]) for i in top if np.isfinite(scores[i])]
+
+    def search_text(self, embedder, text, k=10, company=None):
+        return self.search(embedder.embed([text])[0], k, company)
+
+    def related(self, row, k=10, company=None):
+        """Questions most similar to the one stored at `row`, itself excluded"""
+        return self.search(self.vectors()[row], k, company, exclude=row)
+
+
+class EmbeddingBatcher:
+    """Collects new questions and embeds them in batches of batch_size"""
+
+    def __init__(self, index, embedder, batch_size=256):
+        self.index = index
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.pending = []  # (text, meta)
+        self.embedded = 0
+        self.skipped = 0
+        self.batches = 0
+        self._seen = set()  # ids queued by this batcher, including batches still being embedded
+        self._lock = asyncio.Lock()
+
+    async def add(self, company, profile, questions):
+        for q in questions:
+            qid = question_id(company, profile, q.get("question"))
+            if qid in self.index.ids or qid in self._seen:
+                self.skipped += 1
+                continue
+            self._seen.add(qid)
+            meta = {"id": qid, "company": company, "profile": profile, "question": q.get("question")}
+            self.pending.append((question_text(q), meta))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            while self.pending:
+                batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+                vectors = await asyncio.to_thread(self.embedder.embed, [text for text, _ in batch])
+                await asyncio.to_thread(self.index.append, vectors, [meta for _, meta in batch])
+                self.embedded += len(batch)
+                self.batches += 1
+
+
+def open_index(root, embedder):
+    return EmbeddingIndex(root, embedder.dim, embedder.name)
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    from page_cache import DEFAULT_CACHE_DIR
+
+    default_root = os.getenv("SCRAPER_EMBED_DIR") or os.path.join(
+        os.getenv("SCRAPER_CACHE_DIR", DEFAULT_CACHE_DIR), "embeddings")
+    parser = argparse.ArgumentParser(description="Build or query the question embedding index")
+    parser.add_argument("--index", default=default_root, help="index directory")
+    parser.add_argument("--embedder", default=os.getenv("SCRAPER_EMBEDDER", DEFAULT_EMBEDDER))
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="embed every question not in the index yet")
+    build.add_argument("--bundle", help="read questions from a bundle (see bundle.py) instead of Mongo")
+    build.add_argument("--from-json", help="read questions from a JSON array of documents")
+    build.add_argument("--batch-size", type=int, default=int(os.getenv("SCRAPER_EMBED_BATCH", "256")))
+    search = sub.add_parser("search", help="questions closest to a skill or topic")
+    search.add_argument("text")
+    search.add_argument("-k", type=int, default=5)
+    search.add_argument("--company")
+    args = parser.parse_args(argv)
+
+    embedder = get_embedder(args.embedder)
+    index = open_index(args.index, embedder)
+
+    if args.command == "search":
+        started = time.perf_counter()
+        results = index.search_text(embedder, args.text, args.k, args.company)
+        elapsed = (time.perf_counter() - started) * 1000
+        for score, meta in results:
+            print(f"{score:.3f}  {meta['company']:<12} {meta['question']}")
+        print(f"🔎 {len(results)} of {len(index)} questions in {elapsed:.1f} ms")
+        return
+
+    if args.bundle:
+        from bundle import Bundle
+
+        with Bundle(args.bundle) as b:
+            docs = [b.document(e["company"], e["profile"]) for e in b.entries]
+    elif args.from_json:
+        with open(args.from_json) as f:
+            docs = json.load(f)
+    else:
+        from dotenv import load_dotenv
+        from pymongo import MongoClient
+
+        load_dotenv(os.path.join(os.path.dirname(__file__), '../.env'))
+        if not os.getenv("MONGODB_URI"):
+            parser.error("MONGODB_URI is not set; use --bundle or --from-json")
+        collection = MongoClient(os.getenv("MONGODB_URI"))["brainwave"]["mocktest_data"]
+        docs = collection.find({}, {"_id": 0, "company": 1, "profile": 1, "questions": 1})
+
+    batcher = EmbeddingBatcher(index, embedder, args.batch_size)
+
+    async def run():
+        for doc in docs:
+            await batcher.add(doc["company"], doc.get("profile"), doc.get("questions") or [])
+        await batcher.flush()
+
+    started = time.perf_counter()
+    asyncio.run(run())
+    print(f"✅ Embedded {batcher.embedded} new questions in {batcher.batches} batches "
+          f"({batcher.skipped} already indexed, {len(index)} total) in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
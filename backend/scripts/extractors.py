@@ -0,0 +1,197 @@
+"""HTML -> plain text backends for get_website_text.
+
+All backends drop script/style/nav/footer content and produce the same
+line-per-phrase text as the original BeautifulSoup code, cut to a character
+budget. They differ in how much work they do to get there:
+
+- reference:  BeautifulSoup + html.parser, builds the whole tree (the original code)
+- lxml:       libxml2 SAX-style target parser fed in chunks; stops once the budget is full
+- selectolax: lexbor/modest C parser; parses the whole page, then walks text
+              nodes only until the budget is full
+
+"auto" uses lxml, then selectolax, then reference, whichever is installed
+first (fastest first, see bench_extract.py).
+"""
+
+SKIP_TAGS = {"script", "style", "nav", "footer"}
+DEFAULT_BUDGET = 12000
+FEED_CHUNK = 16 * 1024
+
+
+class TextBudget:
+    """Incremental version of the original line/phrase cleanup.
+
+    Feeding text piece by piece produces exactly what the original code
+    produces for the concatenated text, but we can stop as soon as the
+    budget is reached instead of cleaning the whole page.
+
+    Phrases ("  "-separated parts of a line) are emitted as soon as they are
+    complete, and the unfinished one is kept as a list of pieces, so a
+    minified page (no line breaks at all) costs linear time too.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.parts = []
+        self.size = 0
+        self.pending = []  # pieces of the unfinished phrase, leading whitespace dropped
+        self.pending_size = 0
+
+    @property
+    def full(self):
+        return self.size >= self.budget
+
+    def _emit(self, phrase):
+        phrase = phrase.strip()
+        if phrase:
+            # +1 for the '\n' joining it to the previous phrase
+            self.size += len(phrase) + (1 if self.parts else 0)
+            self.parts.append(phrase)
+
+    def _flush_pending(self):
+        if self.pending:
+            self._emit("".join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def _extend(self, piece):
+        if not self.pending:
+            piece = piece.lstrip()
+        if piece:
+            self.pending.append(piece)
+            self.pending_size += len(piece)
+
+    def _add_segment(self, text):
+        """Text from within one line (no line breaks)"""
+        # A "  " split across the previous piece and this one
+        if self.pending and self.pending[-1].endswith(" ") and text.startswith(" "):
+            self._flush_pending()
+            text = text[1:]
+        pieces = text.split("  ")
+        self._extend(pieces[0])
+        for piece in pieces[1:]:
+            self._flush_pending()
+            if self.full:
+                return
+            self._extend(piece)
+        # Anything the phrase still grows by would be cut off: it is final
+        last = self.pending[-1] if self.pending else ""
+        trailing = len(last) - len(last.rstrip())
+        if trailing < len(last) and self.pending_size - trailing >= self.budget - self.size - (1 if self.parts else 0):
+            self._flush_pending()
+
+    def add(self, text):
+        if self.full:
+            return
+        for line in text.splitlines(keepends=True):
+            body = line.splitlines()[0]
+            self._add_segment(body)
+            if body != line:  # has its line break, so the line is complete
+                self._flush_pending()
+            if self.full:
+                return
+
+    def result(self):
+        if not self.full:
+            self._flush_pending()
+        return "\n".join(self.parts)[:self.budget]
+
+
+def extract_reference(html, budget=DEFAULT_BUDGET):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(list(SKIP_TAGS)):
+        script.extract()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+    return text[:budget]
+
+
+class _LxmlCollector:
+    def __init__(self, budget):
+        self.out = TextBudget(budget)
+        self.skip_depth = 0
+
+    def start(self, tag, attrib):
+        if self.skip_depth or tag in SKIP_TAGS:
+            self.skip_depth += 1
+
+    def end(self, tag):
+        if self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, text):
+        if not self.skip_depth:
+            self.out.add(text)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self.out
+
+
+def extract_lxml(html, budget=DEFAULT_BUDGET):
+    from lxml import etree
+
+    collector = _LxmlCollector(budget)
+    parser = etree.HTMLParser(target=collector)
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    for start in range(0, len(html), FEED_CHUNK):
+        parser.feed(html[start:start + FEED_CHUNK])
+        if collector.out.full:
+            break
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        pass
+    return collector.out.result()
+
+
+def extract_selectolax(html, budget=DEFAULT_BUDGET):
+    try:
+        from selectolax.lexbor import LexborHTMLParser as Parser
+    except ImportError:
+        from selectolax.parser import HTMLParser as Parser
+
+    tree = Parser(html)
+    tree.strip_tags(list(SKIP_TAGS))
+    out = TextBudget(budget)
+    root = tree.root
+    if root is None:
+        return ""
+    for node in root.traverse(include_text=True):
+        if node.tag == "-text":
+            out.add(node.text(deep=False))
+            if out.full:
+                break
+    return out.result()
+
+
+BACKENDS = {
+    "lxml": ("lxml", extract_lxml),
+    "selectolax": ("selectolax", extract_selectolax),
+    "reference": ("bs4", extract_reference),
+}
+
+
+def available_backends():
+    import importlib.util
+
+    return [name for name, (module, _) in BACKENDS.items() if importlib.util.find_spec(module)]
+
+
+def get_extractor(name="auto"):
+    """Return (backend_name, extract_fn); 'auto' prefers lxml, then selectolax"""
+    if name == "auto":
+        available = available_backends()
+        if not available:
+            raise RuntimeError("No HTML extractor installed (need selectolax, lxml or bs4)")
+        name = available[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown extractor '{name}', pick one of: auto, {', '.join(BACKENDS)}")
+    return name, BACKENDS[name][1]
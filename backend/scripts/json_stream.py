@@ -0,0 +1,148 @@
+"""Incremental extraction of MCQ objects from (streamed) LLM output.
+
+The model is asked for a JSON array of objects, but it may wrap it in prose or
+code fences, think out loud first, add stray brackets after it, or get cut
+off mid-item. Instead of regex-matching the whole response and hoping one
+json.loads works, MCQStreamParser scans the text once, tracking strings and
+bracket depth, and hands back every object of the top-level array as soon as
+its closing brace arrives. A truncated array still yields every item that was
+complete.
+
+KeyedMCQStreamParser does the same for packed prompts, where the answer is an
+object of arrays keyed by section id ({"T1": [...], "T2": [...]}); each item
+comes back tagged with its section as item["_key"]. Its inner parsers are
+anchored: each one ends at its own array's closing bracket, even when that
+array held no objects, so items never spill over into another section.
+"""
+
+import json
+import re
+
+
+class MCQStreamParser:
+    def __init__(self, anchored=False):
+        # anchored: the text starts at the array, so an empty one is the answer, not stray prose
+        self.anchored = anchored
+        self.buf = ""
+        self.pos = 0          # next index of buf to scan
+        self.in_array = False
+        self.depth = 0        # bracket depth inside the array (1 == directly inside it)
+        self.obj_start = None
+        self.in_string = False
+        self.escape = False
+        self.found = 0        # objects produced by the current array
+        self.done = False
+
+    def _reset_array(self):
+        self.in_array = False
+        self.depth = 0
+        self.obj_start = None
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, chunk):
+        """Scan more text; returns the objects that were completed by it"""
+        if self.done or not chunk:
+            return []
+        self.buf += chunk
+        items = []
+        buf = self.buf
+        i = self.pos
+        n = len(buf)
+
+        while i < n:
+            if not self.in_array:
+                i = buf.find("[", i)
+                if i == -1:
+                    i = n
+                    break
+                self.in_array = True
+                self.depth = 1
+                self.found = 0
+                i += 1
+                continue
+
+            ch = buf[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "[{":
+                if ch == "{" and self.depth == 1:
+                    self.obj_start = i
+                self.depth += 1
+            elif ch in "]}":
+                self.depth -= 1
+                if self.depth == 1 and ch == "}" and self.obj_start is not None:
+                    try:
+                        obj = json.loads(buf[self.obj_start:i + 1])
+                    except ValueError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        items.append(obj)
+                        self.found += 1
+                    self.obj_start = None
+                elif self.depth == 0:
+                    if self.found or self.anchored:
+                        self.done = True
+                        i += 1
+                        break
+                    # Something like "[15]" in prose before the real array; keep looking
+                    self._reset_array()
+            i += 1
+
+        # Drop text we will never need again so long streams stay cheap
+        keep_from = self.obj_start if self.obj_start is not None else i
+        self.buf = buf[keep_from:]
+        self.pos = i - keep_from
+        if self.obj_start is not None:
+            self.obj_start = 0
+        return items
+
+
+def extract_json(text):
+    """All complete MCQ objects in text, or None when there are none"""
+    if not text:
+        return None
+    return MCQStreamParser().feed(text) or None
+
+
+class KeyedMCQStreamParser:
+    """MCQStreamParser for {"key": [mcq, ...], ...}; never `done`, the caller stops on count"""
+
+    _KEY = re.compile(r'"([^"\\]{1,64})"\s*:\s*\[')
+
+    def __init__(self):
+        self.buf = ""
+        self.key = None
+        self.inner = None
+        self.done = False
+
+    def feed(self, chunk):
+        items = []
+        self.buf += chunk or ""
+        while self.buf:
+            if self.inner is None:
+                match = self._KEY.search(self.buf)
+                if not match:
+                    self.buf = self.buf[-80:]  # may hold the start of a key split across chunks
+                    break
+                self.key = match.group(1)
+                self.inner = MCQStreamParser(anchored=True)
+                text, self.buf = self.buf[match.end() - 1:], ""
+            else:
+                text, self.buf = self.buf, ""
+            for item in self.inner.feed(text):
+                item["_key"] = self.key
+                items.append(item)
+            if not self.inner.done:
+                break
+            # This key's array closed: carry what follows it over to the next key
+            self.buf = self.inner.buf[self.inner.pos:]
+            self.inner = None
+        return items
@@ -0,0 +1,111 @@
+"""Mongo-backed target leases for running several scraper workers at once.
+
+Workers (processes on one machine or on many, sharing the same Mongo
+database) claim a (company, profile) before touching it. A claim is a single
+find_one_and_update with upsert on the scrape_leases collection, which has a
+unique (company, profile) index: it either takes a lease that is free,
+expired or already ours, or fails with DuplicateKeyError because another
+worker holds a live one. Held leases are extended by a heartbeat; a worker
+that dies simply stops heart-beating and its leases expire after ttl seconds.
+A worker whose heartbeats keep failing until its leases would expire
+forgets all of them, so it doesn't write targets another worker took over.
+"""
+
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseManager:
+    def __init__(self, collection, worker_id=None, ttl=300.0, clock=None):
+        self.collection = collection
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self.held = set()
+        self.claimed = 0
+        self.lost = 0
+
+    def ensure_indexes(self):
+        self.collection.create_index(
+            [("company", ASCENDING), ("profile", ASCENDING)], name="company_profile", unique=True
+        )
+
+    def claim(self, key):
+        """Try to take the lease on key; True if this worker now holds it"""
+        company, profile = key
+        now = self.clock()
+        try:
+            doc = self.collection.find_one_and_update(
+                {
+                    "company": company,
+                    "profile": profile,
+                    "$or": [{"owner": self.worker_id}, {"owner": None}, {"lease_until": {"$lt": now}}],
+                },
+                {"$set": {
+                    "owner": self.worker_id,
+                    "lease_until": now + timedelta(seconds=self.ttl),
+                    "heartbeat_at": now,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return False  # the lease document exists and someone else's lease is live
+        if doc and doc.get("owner") == self.worker_id:
+            self.held.add(key)
+            self.claimed += 1
+            return True
+        return False
+
+    def release(self, key):
+        self.release_many([key])
+
+    def release_many(self, keys):
+        """Hand keys back in one update; ones we no longer hold are left alone"""
+        keys = [k for k in keys if k in self.held]
+        if not keys:
+            return
+        self.held.difference_update(keys)
+        self.collection.update_many(
+            {"owner": self.worker_id, "$or": [{"company": c, "profile": p} for c, p in keys]},
+            {"$set": {"owner": None, "lease_until": None}},
+        )
+
+    def release_all(self):
+        self.release_many(list(self.held))
+
+    def heartbeat(self):
+        """Extend every lease we still hold; forget any that expired and were taken over"""
+        now = self.clock()
+        for key in list(self.held):
+            result = self.collection.update_one(
+                {"company": key[0], "profile": key[1], "owner": self.worker_id},
+                {"$set": {"lease_until": now + timedelta(seconds=self.ttl), "heartbeat_at": now}},
+            )
+            if result.matched_count == 0:
+                self.held.discard(key)
+                self.lost += 1
+
+    async def heartbeat_loop(self):
+        last_ok = self.clock()
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await asyncio.to_thread(self.heartbeat)
+                last_ok = self.clock()
+            except Exception as e:
+                # A transient error (AutoReconnect, ...) mustn't end the loop: try again next beat
+                print(f"   ⚠️ Lease heartbeat failed: {e}")
+                if (self.clock() - last_ok).total_seconds() + self.ttl / 3 >= self.ttl:
+                    # Our leases expire before the next beat and may be taken over: none are ours
+                    self.lost += len(self.held)
+                    self.held.clear()
@@ -0,0 +1,100 @@
+"""Persistent completion cache for the scraper's LLM calls.
+
+Completions are keyed by (model_id, sha256 of the whitespace-normalized
+messages), so re-running a target with the same page text and profile costs no
+API call. Entries carry the raw response, the parsed questions and the latency
+of the original call, expire after a TTL, and the table is trimmed to a maximum
+number of rows (least recently used first).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def prompt_hash(messages):
+    normalized = [
+        {"role": m["role"], "content": " ".join(m["content"].split())}
+        for m in messages
+    ]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600, max_entries=5000, enabled=True, refresh=False):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # enabled=False: neither read nor write (--no-cache)
+        # refresh=True: ignore stored entries but record new ones (--refresh)
+        self.enabled = enabled
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS completions (
+                model_id TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                response TEXT NOT NULL,
+                questions TEXT NOT NULL,
+                latency REAL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model_id, prompt_hash)
+            );
+            CREATE INDEX IF NOT EXISTS completions_last_access ON completions(last_access);
+        """)
+
+    def get(self, model_ids, messages):
+        """Return (questions, model_id) for the first model in model_ids with a fresh entry"""
+        if not self.enabled or self.refresh:
+            return None, None
+        key = prompt_hash(messages)
+        now = time.time()
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT model_id, questions FROM completions WHERE prompt_hash = ? AND created_at >= ?"
+                f" AND model_id IN ({','.join('?' * len(model_ids))})",
+                (key, now - self.ttl_seconds, *model_ids),
+            ).fetchall()
+            found = dict(rows)
+            for model_id in model_ids:
+                if model_id in found:
+                    self.db.execute(
+                        "UPDATE completions SET last_access = ? WHERE model_id = ? AND prompt_hash = ?",
+                        (now, model_id, key),
+                    )
+                    self.db.commit()
+                    self.hits += 1
+                    return json.loads(found[model_id]), model_id
+        self.misses += 1
+        return None, None
+
+    def put(self, model_id, messages, response, questions, latency):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO completions"
+                " (model_id, prompt_hash, response, questions, latency, created_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model_id, prompt_hash(messages), response, json.dumps(questions), latency, now, now),
+            )
+            self._evict(now)
+            self.db.commit()
+
+    def _evict(self, now):
+        self.db.execute("DELETE FROM completions WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.db.execute(
+            "DELETE FROM completions WHERE rowid IN ("
+            " SELECT rowid FROM completions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
@@ -0,0 +1,217 @@
+"""Timing spans and counters for the scraper pipeline.
+
+    with metrics.span("fetch", host=host):
+        ...
+    metrics.count("cache", cache="page", result="hit")
+
+Every finished span is appended to an optional JSON-lines trace (one object
+per line: ts, span, seconds, labels, error). Spans and counters are also
+aggregated in memory for the end-of-run summary table and for a Prometheus
+text-format file (write_prometheus), which node_exporter's textfile
+collector or a plain scrape of the file can pick up.
+
+Spans named in `profile` are run under cProfile (or pyinstrument when
+profiler="pyinstrument" and it is installed); stats for each profiled span
+name are written to profile_dir when the run closes. Only one profiler can
+be active per process, so a profiled span that starts while another is
+running is timed but not profiled.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_SAMPLES = 10000  # per span name, for the percentiles
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def _prom_labels(pairs):
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{v}"'.replace("\n", " ") for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class Metrics:
+    def __init__(self, trace_path=None, profile=(), profile_dir=".", profiler="cprofile"):
+        self._lock = threading.Lock()
+        self.spans = {}      # name -> {"count", "sum", "errors", "samples"}
+        self.counters = {}   # (name, label key) -> value
+        self.trace = open(trace_path, "a", buffering=1) if trace_path else None
+        self.profile = set(profile)
+        self.profile_dir = profile_dir
+        self.profiler = profiler
+        self._profiling = False
+        self._profiles = {}  # span name -> cProfile.Profile / pyinstrument sessions
+
+    # --- recording ---
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block (awaits included) as one `name` span"""
+        profiler = self._start_profile(name) if name in self.profile else None
+        started = time.perf_counter()
+        error = None
+        try:
+            yield labels  # callers may add labels (e.g. status) before the block ends
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, error=error, **labels)
+            if profiler is not None:
+                self._stop_profile(name, profiler)
+
+    def observe(self, name, seconds, error=None, **labels):
+        """Record a span whose duration was measured elsewhere"""
+        with self._lock:
+            s = self.spans.setdefault(name, {"count": 0, "sum": 0.0, "errors": 0, "samples": []})
+            s["count"] += 1
+            s["sum"] += seconds
+            if error:
+                s["errors"] += 1
+            if len(s["samples"]) < MAX_SAMPLES:
+                s["samples"].append(seconds)
+            if self.trace:
+                event = {"ts": round(time.time(), 6), "span": name, "seconds": round(seconds, 6)}
+                if labels:
+                    event["labels"] = {k: v for k, v in labels.items() if v is not None}
+                if error:
+                    event["error"] = error
+                self.trace.write(json.dumps(event) + "\n")
+
+    def count(self, name, value=1, **labels):
+        with self._lock:
+            key = (name, _label_key(labels))
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def counter(self, name, **labels):
+        """Sum of `name` over every label set matching the given labels"""
+        want = set(_label_key(labels))
+        return sum(v for (n, key), v in self.counters.items() if n == name and want <= set(key))
+
+    # --- profiling hook ---
+
+    def _start_profile(self, name):
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+        try:
+            if self.profiler == "pyinstrument":
+                from pyinstrument import Profiler
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+            return profiler
+        except Exception as e:
+            print(f"   ⚠️ Could not profile '{name}': {e}")
+            self._profiling = False
+            return None
+
+    def _stop_profile(self, name, profiler):
+        if self.profiler == "pyinstrument":
+            profiler.stop()
+            session = profiler.last_session
+        else:
+            profiler.disable()
+            session = profiler
+        with self._lock:
+            self._profiling = False
+            self._profiles.setdefault(name, []).append(session)
+
+    def _write_profiles(self):
+        if not self._profiles:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        for name, sessions in self._profiles.items():
+            if self.profiler == "pyinstrument":
+                from pyinstrument.renderers import HTMLRenderer
+                from pyinstrument.session import Session
+                session = sessions[0]
+                for other in sessions[1:]:
+                    session = Session.combine(session, other)
+                path = os.path.join(self.profile_dir, f"profile-{name}.html")
+                with open(path, "w") as f:
+                    f.write(HTMLRenderer().render(session))
+            else:
+                import pstats
+                stats = pstats.Stats(sessions[0])
+                for other in sessions[1:]:
+                    stats.add(other)
+                path = os.path.join(self.profile_dir, f"profile-{name}.pstats")
+                stats.dump_stats(path)
+            print(f"   🔬 Profile of {len(sessions)} '{name}' spans: {path}")
+
+    # --- output ---
+
+    def summary(self):
+        """Per span: calls, total/p50/p95/max seconds and error count, slowest total first"""
+        with self._lock:
+            rows = [
+                {
+                    "span": name,
+                    "calls": s["count"],
+                    "total": round(s["sum"], 3),
+                    "p50": round(_percentile(s["samples"], 50), 3),
+                    "p95": round(_percentile(s["samples"], 95), 3),
+                    "max": round(max(s["samples"]), 3),
+                    "errors": s["errors"],
+                }
+                for name, s in self.spans.items() if s["samples"]
+            ]
+        return sorted(rows, key=lambda r: r["total"], reverse=True)
+
+    def prometheus(self, prefix="scraper"):
+        lines = []
+        with self._lock:
+            spans = {name: dict(s, samples=list(s["samples"])) for name, s in self.spans.items()}
+            counters = dict(self.counters)
+        if spans:
+            metric = f"{prefix}_span_seconds"
+            lines.append(f"# HELP {metric} Time spent in each pipeline stage")
+            lines.append(f"# TYPE {metric} summary")
+            for name, s in sorted(spans.items()):
+                for q in (0.5, 0.95):
+                    value = _percentile(s["samples"], q * 100)
+                    lines.append(f"{metric}{_prom_labels([('span', name), ('quantile', q)])} {value or 0:.6f}")
+                lines.append(f"{metric}_sum{_prom_labels([('span', name)])} {s['sum']:.6f}")
+                lines.append(f"{metric}_count{_prom_labels([('span', name)])} {s['count']}")
+            metric = f"{prefix}_span_errors_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, s in sorted(spans.items()):
+                lines.append(f"{metric}{_prom_labels([('span', name)])} {s['errors']}")
+        for name in sorted({n for n, _ in counters}):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (n, key), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{metric}{_prom_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+    def close(self):
+        self._write_profiles()
+        if self.trace:
+            self.trace.close()
+            self.trace = None
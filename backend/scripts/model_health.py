@@ -0,0 +1,196 @@
+"""Persisted per-model health table and router for the scraper.
+
+For every model ID we keep a rolling window of recent latencies and call
+outcomes (ok / parse / 429 / 404 / error) plus token and cost totals, and a
+circuit breaker:
+
+- closed:    model is routed normally
+- open:      model is skipped until its cooldown expires (404s open it for a day)
+- half_open: cooldown expired; one probe call is let through, success closes
+             the breaker, failure re-opens it with a doubled cooldown
+
+The table is a JSON file next to the other scraper caches so the ordering
+learned in one run carries over to the next. check_models.py can seed it with
+the provider's catalog so IDs that no longer exist are skipped up front.
+"""
+
+import json
+import os
+import time
+from collections import deque
+
+WINDOW = 50
+FAILURE_THRESHOLD = 3
+BASE_COOLDOWN = 60.0
+MAX_COOLDOWN = 3600.0
+NOT_FOUND_COOLDOWN = 24 * 3600.0
+OUTCOMES = ("ok", "parse", "429", "404", "error")
+
+
+class ModelStats:
+    def __init__(self, data=None):
+        data = data or {}
+        self.latencies = deque(data.get("latencies", []), maxlen=WINDOW)
+        self.outcomes = deque(data.get("outcomes", []), maxlen=WINDOW)
+        self.tokens = data.get("tokens", 0)
+        self.cost = data.get("cost", 0.0)
+        self.state = data.get("state", "closed")
+        self.opened_at = data.get("opened_at", 0.0)
+        self.cooldown = data.get("cooldown", BASE_COOLDOWN)
+        self.failures = data.get("failures", 0)  # consecutive
+        self.probing = False
+
+    def to_dict(self):
+        return {
+            "latencies": list(self.latencies),
+            "outcomes": list(self.outcomes),
+            "tokens": self.tokens,
+            "cost": self.cost,
+            "state": self.state,
+            "opened_at": self.opened_at,
+            "cooldown": self.cooldown,
+            "failures": self.failures,
+        }
+
+    def rate(self, outcome):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for o in self.outcomes if o == outcome) / len(self.outcomes)
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        samples = sorted(self.latencies)
+        return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+    def success_rate(self):
+        # Laplace smoothing so an untried model starts at 0.5 instead of 0 or 1
+        ok = sum(1 for o in self.outcomes if o == "ok")
+        return (ok + 1) / (len(self.outcomes) + 2)
+
+    def score(self):
+        p50 = self.percentile(50)
+        latency = p50 if p50 is not None else 10.0
+        return self.success_rate() * (1 - self.rate("429")) / (1 + latency / 10)
+
+
+class ModelHealth:
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.models = {}
+        self.catalog = None
+        self.catalog_at = None
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.models = {m: ModelStats(d) for m, d in data.get("models", {}).items()}
+            self.catalog = set(data["catalog"]) if data.get("catalog") else None
+            self.catalog_at = data.get("catalog_at")
+
+    def stats(self, model_id):
+        if model_id not in self.models:
+            self.models[model_id] = ModelStats()
+        return self.models[model_id]
+
+    def percentile(self, model_id, q, min_samples=5):
+        stats = self.stats(model_id)
+        if len(stats.latencies) < min_samples:
+            return None
+        return stats.percentile(q)
+
+    def _available(self, model_id):
+        stats = self.stats(model_id)
+        if self.catalog is not None and model_id not in self.catalog:
+            return False
+        if stats.state == "open":
+            if self.clock() - stats.opened_at < stats.cooldown:
+                return False
+            stats.state = "half_open"
+        if stats.state == "half_open":
+            return not stats.probing
+        return True
+
+    def route(self, model_ids):
+        """Healthy models, best first; the configured order breaks ties"""
+        usable = [m for m in model_ids if self._available(m)]
+        position = {m: i for i, m in enumerate(model_ids)}
+        return sorted(usable, key=lambda m: (-round(self.stats(m).score(), 3), position[m]))
+
+    def begin(self, model_id):
+        """Call right before sending a request; claims the single half-open probe slot.
+
+        False if the model can't be used any more: another concurrent call took
+        the probe slot (or opened the breaker) since it was routed.
+        """
+        if not self._available(model_id):
+            return False
+        stats = self.stats(model_id)
+        if stats.state == "half_open":
+            stats.probing = True
+        return True
+
+    def record(self, model_id, outcome, latency=None, tokens=0, cost=0.0):
+        stats = self.stats(model_id)
+        stats.outcomes.append(outcome)
+        if latency is not None and outcome in ("ok", "parse"):
+            stats.latencies.append(round(latency, 3))
+        stats.tokens += tokens or 0
+        stats.cost += cost or 0.0
+        stats.probing = False
+
+        if outcome == "ok":
+            stats.state = "closed"
+            stats.failures = 0
+            stats.cooldown = BASE_COOLDOWN
+            return
+        stats.failures += 1
+        if outcome == "404":
+            self._open(stats, NOT_FOUND_COOLDOWN)
+        elif stats.state == "half_open":
+            self._open(stats, min(MAX_COOLDOWN, stats.cooldown * 2))
+        elif stats.failures >= FAILURE_THRESHOLD:
+            self._open(stats, stats.cooldown)
+
+    def _open(self, stats, cooldown):
+        stats.state = "open"
+        stats.opened_at = self.clock()
+        stats.cooldown = cooldown
+
+    def seed_catalog(self, model_ids):
+        """Remember which IDs the provider actually serves; others are never routed"""
+        self.catalog = set(model_ids)
+        self.catalog_at = self.clock()
+        for model_id, stats in self.models.items():
+            if model_id in self.catalog and stats.state == "open" and stats.cooldown >= NOT_FOUND_COOLDOWN:
+                stats.state = "closed"
+                stats.failures = 0
+                stats.cooldown = BASE_COOLDOWN
+
+    def save(self):
+        data = {
+            "models": {m: s.to_dict() for m, s in self.models.items()},
+            "catalog": sorted(self.catalog) if self.catalog is not None else None,
+            "catalog_at": self.catalog_at,
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"  # worker processes save concurrently
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def summary(self):
+        rows = []
+        for model_id, s in sorted(self.models.items(), key=lambda kv: -kv[1].score()):
+            rows.append({
+                "model": model_id,
+                "state": s.state,
+                "p50": s.percentile(50),
+                "p95": s.percentile(95),
+                "ok_rate": round(s.rate("ok"), 2),
+                "parse_fail_rate": round(s.rate("parse"), 2),
+                "rate_429": round(s.rate("429"), 2),
+                "tokens": s.tokens,
+                "cost": round(s.cost, 4),
+            })
+        return rows
@@ -0,0 +1,196 @@
+"""Probe OpenRouter models and cache which ones work, and how fast.
+
+probe() lists the provider's catalog, then sends every candidate a tiny
+streamed completion at once (up to `concurrency` in flight) and records per
+model:
+
+- status: ok, 404, 429 or error;
+- ttft: seconds to the first streamed token, and latency for the whole answer;
+- tokens_per_sec: completion tokens over the time spent streaming them, or
+  None when the reply came in one burst (a single chunk, or chunks less
+  than MIN_RATE_WINDOW apart: no window to measure);
+- json_mode: whether response_format={"type": "json_object"} was accepted
+  and the answer parsed as JSON (models that reject it are asked again
+  without, so they can still be ranked).
+
+The result is a manifest (written by check_models.py to
+CACHE_DIR/models.json) with a created_at and ttl. While it is fresh the
+scraper takes its model list from manifest["ranked"] (working models,
+quickest expected completion first, or lowest latency when some model has
+no measured rate) instead of DEFAULT_MODELS.
+"""
+
+import asyncio
+import json
+import os
+import time
+
+from chunking import estimate_tokens
+
+# Used when there is no fresh manifest (and as the preferred probe candidates)
+DEFAULT_MODELS = [
+    # Primary: Fast Google Models
+    "google/gemini-2.0-flash-exp:free",
+    "google/gemini-2.0-pro-exp-02-05:free",
+
+    # Secondary: Reliable Open Source (Different Providers)
+    "meta-llama/llama-3.3-70b-instruct:free",
+    "deepseek/deepseek-r1:free",
+    "microsoft/phi-3-mini-128k-instruct:free",
+
+    # Last Resort
+    "openrouter/auto"
+]
+
+LAST_RESORT = "openrouter/auto"
+PROBE_PROMPT = 'Reply with the JSON object {"ok": true} and nothing else.'
+PROBE_MAX_TOKENS = 24
+# Ranking assumes a typical MCQ completion of this many tokens
+EXPECTED_TOKENS = 1500
+MIN_RATE_WINDOW = 0.05  # seconds of streaming needed before a tokens/s figure means anything
+
+
+async def list_catalog(client):
+    """Model IDs the provider serves"""
+    return [model.id async for model in client.models.list()]
+
+
+def pick_candidates(catalog, preferred=DEFAULT_MODELS, limit=12):
+    """Preferred IDs the catalog still has, then other free models, up to limit"""
+    served = set(catalog) if catalog is not None else None
+    picked = [m for m in preferred if served is None or m in served or m == LAST_RESORT]
+    for model_id in sorted(served or ()):
+        if len(picked) >= limit:
+            break
+        if model_id.endswith(":free") and model_id not in picked:
+            picked.append(model_id)
+    return picked[:max(limit, 1)]
+
+
+async def _complete(client, model_id, json_mode):
+    kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+    started = time.perf_counter()
+    stream = await client.chat.completions.create(
+        model=model_id,
+        messages=[{"role": "user", "content": PROBE_PROMPT}],
+        max_tokens=PROBE_MAX_TOKENS,
+        temperature=0,
+        stream=True,
+        stream_options={"include_usage": True},
+        **kwargs,
+    )
+    pieces, first, last, usage = [], None, None, None
+    async for chunk in stream:
+        if chunk.usage:
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            last = time.perf_counter()
+            if first is None:
+                first = last
+            pieces.append(chunk.choices[0].delta.content)
+    finished = time.perf_counter()
+    text = "".join(pieces)
+    tokens = getattr(usage, "completion_tokens", None) or estimate_tokens(text)
+    first = first or finished
+    # A probe reply is a few tokens; in one chunk the streaming window is ~0 and a rate means nothing
+    rate = tokens / (last - first) if len(pieces) >= 2 and last - first >= MIN_RATE_WINDOW else None
+    return text, first - started, finished - started, rate
+
+
+def _is_json(text):
+    text = text.strip().strip("`").removeprefix("json").strip()
+    try:
+        json.loads(text)
+        return True
+    except ValueError:
+        return False
+
+
+async def probe_model(client, model_id, timeout=30.0):
+    result = {"id": model_id, "status": "error", "ttft": None, "latency": None,
+              "tokens_per_sec": None, "json_mode": False, "error": None}
+    for json_mode in (True, False):
+        try:
+            text, ttft, latency, rate = await asyncio.wait_for(_complete(client, model_id, json_mode), timeout)
+        except asyncio.TimeoutError:
+            result["error"] = f"no answer in {timeout:.0f}s"
+            return result
+        except Exception as e:
+            status = getattr(e, "status_code", None)
+            if json_mode and status in (400, 422):
+                continue  # response_format not supported: try again without it
+            result["status"] = "404" if status == 404 else "429" if status == 429 else "error"
+            result["error"] = str(e)[:200]
+            return result
+        result.update(status="ok", ttft=round(ttft, 3), latency=round(latency, 3),
+                      tokens_per_sec=round(rate, 1) if rate is not None else None, json_mode=json_mode and _is_json(text))
+        return result
+    return result
+
+
+def expected_seconds(row):
+    return row["ttft"] + EXPECTED_TOKENS / max(row["tokens_per_sec"] or 0, 1.0)
+
+
+def rank(results):
+    """Working models, quickest expected completion first; the auto router stays last.
+
+    Without a measured rate for every model, they are compared by probe latency instead.
+    """
+    ok = [r for r in results if r["status"] == "ok"]
+    speed = expected_seconds if all(r["tokens_per_sec"] for r in ok) else (lambda r: r["latency"])
+    ok.sort(key=lambda r: (r["id"] == LAST_RESORT, speed(r)))
+    return [r["id"] for r in ok]
+
+
+async def probe(client, candidates=None, catalog=None, concurrency=6, timeout=30.0, ttl_hours=24.0):
+    """Probe candidates (default: pick_candidates(catalog)) concurrently and build a manifest"""
+    if catalog is None:
+        try:
+            catalog = await list_catalog(client)
+        except Exception as e:
+            print(f"   ⚠️ Could not list the model catalog: {e}")
+    candidates = candidates or pick_candidates(catalog)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(model_id):
+        if catalog is not None and model_id not in catalog and model_id != LAST_RESORT:
+            return {"id": model_id, "status": "404", "ttft": None, "latency": None,
+                    "tokens_per_sec": None, "json_mode": False, "error": "not in the catalog"}
+        async with slots:
+            return await probe_model(client, model_id, timeout)
+
+    results = await asyncio.gather(*(one(m) for m in candidates))
+    return {
+        "created_at": time.time(),
+        "ttl": ttl_hours * 3600,
+        "base_url": str(client.base_url),
+        "catalog_size": len(catalog) if catalog is not None else None,
+        "models": results,
+        "ranked": rank(results),
+    }
+
+
+def write_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def read_manifest(path, clock=time.time):
+    """(ranked model IDs, None) from a fresh manifest, else (None, why not)"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None, "no model manifest"
+    except ValueError:
+        return None, "unreadable model manifest"
+    age = clock() - manifest.get("created_at", 0)
+    if age > manifest.get("ttl", 0):
+        return None, f"model manifest is {age / 3600:.0f}h old"
+    if not manifest.get("ranked"):
+        return None, "model manifest has no working models"
+    return manifest["ranked"], None
@@ -0,0 +1,118 @@
+"""Batched MongoDB access for the scraper.
+
+Instead of one find_one per target before the crawl and one update_one per
+result after it, the scraper makes a single $in query up front (projected
+down to company, profile and question count) and sends results through
+BufferedWriter, which groups UpdateOne upserts into bulk_write calls by
+batch size or age. RoundTripCounter is a pymongo command listener used to
+report how many commands a run actually sent.
+"""
+
+import asyncio
+import contextlib
+
+from pymongo import ASCENDING, UpdateOne, monitoring
+from pymongo.errors import OperationFailure
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = {}
+
+    @property
+    def total(self):
+        return sum(self.commands.values())
+
+    def started(self, event):
+        self.commands[event.command_name] = self.commands.get(event.command_name, 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def ensure_indexes(collection):
+    collection.create_index([("company", ASCENDING), ("profile", ASCENDING)], name="company_profile")
+
+
+def existing_status(collection, targets):
+    """{(company, profile): {count, scraped_at, content_hash}} for every target, in one query"""
+    companies = sorted({t["company"] for t in targets})
+    query = {"company": {"$in": companies}}
+    fields = {"_id": 0, "company": 1, "profile": 1, "scraped_at": 1, "content_hash": 1}
+    try:
+        docs = list(collection.find(query, dict(fields, count={"$size": {"$ifNull": ["$questions", []]}})))
+    except (OperationFailure, ValueError):
+        # No aggregation expressions in projections (old servers, mongomock): count client-side
+        docs = []
+        for doc in collection.find(query, dict(fields, questions=1)):
+            questions = doc.pop("questions", None)
+            docs.append(dict(doc, count=len(questions) if isinstance(questions, list) else 0))
+    return {
+        (doc["company"], doc.get("profile")): {
+            "count": doc["count"],
+            "scraped_at": doc.get("scraped_at"),
+            "content_hash": doc.get("content_hash"),
+        }
+        for doc in docs
+    }
+
+
+class BufferedWriter:
+    """Queues upserts and flushes them with bulk_write every max_batch ops or max_delay seconds.
+
+    on_written, if given, is called with the filters of each batch once it is
+    stored, in a worker thread (it may do blocking DB work).
+    Each bulk_write is timed as a "db_write" span when a Metrics instance is given.
+    """
+
+    def __init__(self, collection, max_batch=20, max_delay=5.0, on_written=None, metrics=None):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_written = on_written
+        self.metrics = metrics
+        self.ops = []
+        self.filters = []
+        self.written = 0
+        self._lock = asyncio.Lock()
+        self._timer = None
+
+    async def upsert(self, filter, fields):
+        self.ops.append(UpdateOne(filter, {"$set": fields}, upsert=True))
+        self.filters.append(filter)
+        if len(self.ops) >= self.max_batch:
+            await self.flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        try:
+            await self.flush()
+        except Exception as e:
+            # Nobody awaits the timer task: report it here. The targets stay 'validated'
+            # in the work queue, so the next run writes them again.
+            print(f"   ❌ MongoDB flush failed, {e.__class__.__name__}: {e}")
+
+    async def flush(self):
+        async with self._lock:
+            if not self.ops:
+                return
+            ops, self.ops = self.ops, []
+            filters, self.filters = self.filters, []
+            span = self.metrics.span("db_write", ops=len(ops)) if self.metrics else contextlib.nullcontext()
+            with span:
+                result = await asyncio.to_thread(self.collection.bulk_write, ops, ordered=False)
+            self.written += len(ops)
+            if self.on_written:
+                await asyncio.to_thread(self.on_written, filters)
+            print(f"   💾 Flushed {len(ops)} upserts to MongoDB "
+                  f"({result.upserted_count} new, {result.modified_count} updated)")
+
+    async def close(self):
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        await self.flush()
@@ -0,0 +1,129 @@
+"""Pack several small pages into one completion.
+
+Every completion repeats the system prompt and instructions and spends a
+slot of the per-model RPM budget, which dominates for short pages. With
+packing on, small pages are collected by PromptPacker (flushed by token
+budget, target count or age, like BufferedWriter) and sent as one prompt
+with a section per target; the model answers with one JSON object keyed by
+section id, which KeyedMCQStreamParser splits back out as it streams.
+Targets whose section is missing or unusable get None back and are retried
+on their own by the caller. The tokens a packed completion used are split
+across its targets in proportion to the size of their sections.
+"""
+
+import asyncio
+
+from chunking import estimate_tokens
+
+SECTION_OVERHEAD = 20  # tokens for a section header
+
+
+def build_prompt(entries, count):
+    """entries: [(section id, company, profile, text)]"""
+    sections = "\n\n".join(
+        f"### {section}: {profile} at {company}\n{text}" for section, company, profile, text in entries
+    )
+    example = ", ".join(f'"{section}": [...]' for section, *_ in entries[:2])
+    return f"""
+    Extract {count} technical MCQs for each section below.
+    Format: one JSON object only, keyed by section id, like {{{example}}}.
+    Each value is a JSON array of MCQs with keys: question, options (array), answer.
+
+{sections}
+    """
+
+
+def split_tokens(tokens, sizes):
+    """Share `tokens` out in proportion to sizes, in whole tokens that add up to the total"""
+    total = sum(sizes) or 1
+    shares = [tokens * size // total for size in sizes]
+    shares[0] += tokens - sum(shares)
+    return shares
+
+
+def split_results(questions, sections):
+    """{section: [items]} from the tagged items of a packed answer"""
+    grouped = {section: [] for section in sections}
+    for item in questions or []:
+        key = item.pop("_key", None)
+        if key in grouped:
+            grouped[key].append(item)
+    return grouped
+
+
+class PromptPacker:
+    """Collects small targets and sends them as packed completions.
+
+    ask(prompt, count) runs one completion and returns (tagged items, model_id,
+    tokens used). submit() resolves to (questions, model_id, tokens) for that
+    target, or (None, None, tokens); tokens is its share of the completion.
+    """
+
+    def __init__(self, ask, count, budget_tokens=6000, max_targets=4, max_delay=2.0):
+        self.ask = ask
+        self.count = count
+        self.budget_tokens = budget_tokens
+        self.max_targets = max_targets
+        self.max_delay = max_delay
+        self.pending = []  # (company, profile, text, cost, future)
+        self.tokens = 0
+        self.requests = 0
+        self.packed = 0
+        self._timer = None
+        self._sending = set()
+
+    async def submit(self, company, profile, text):
+        cost = estimate_tokens(text) + SECTION_OVERHEAD
+        if self.pending and self.tokens + cost > self.budget_tokens:
+            self._flush()
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((company, profile, text, cost, future))
+        self.tokens += cost
+        if len(self.pending) >= self.max_targets or self.tokens >= self.budget_tokens:
+            self._flush()
+        elif self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_delay)
+        self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        batch, self.pending, self.tokens = self.pending, [], 0
+        task = asyncio.create_task(self._send(batch))
+        self._sending.add(task)
+        task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch):
+        sections = [f"T{n + 1}" for n in range(len(batch))]
+        futures = [future for *_, future in batch]
+        if len(batch) == 1:
+            futures[0].set_result((None, None, 0))  # nothing to share the request with: go solo
+            return
+        prompt = build_prompt(
+            [(section, company, profile, text) for section, (company, profile, text, *_) in zip(sections, batch)],
+            self.count,
+        )
+        self.requests += 1
+        self.packed += len(batch)
+        try:
+            questions, model_id, tokens = await self.ask(prompt, self.count * len(batch))
+        except Exception as e:
+            print(f"   ⚠️ Packed request for {len(batch)} targets failed: {e}")
+            questions, model_id, tokens = None, None, 0
+        grouped = split_results(questions, sections)
+        shares = split_tokens(tokens, [cost for *_, cost, _ in batch])
+        for section, future, share in zip(sections, futures, shares):
+            items = grouped[section]
+            if not future.done():
+                future.set_result((items, model_id, share) if items else (None, None, share))
+
+    async def close(self):
+        if self._timer and not self._timer.done():
+            self._timer.cancel()
+        self._flush()
+        if self._sending:
+            await asyncio.gather(*self._sending, return_exceptions=True)
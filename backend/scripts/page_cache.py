@@ -0,0 +1,173 @@
+"""On-disk HTTP page cache for the scraper.
+
+Pages are indexed by URL in a small SQLite table that keeps the ETag and
+Last-Modified validators, so re-runs can send If-None-Match / If-Modified-Since
+and get a 304 instead of the whole body. Bodies and cleaned text are stored
+content-addressed (sha256 of the raw body), which means an unchanged page is
+never parsed twice and identical pages under different URLs share one copy.
+
+The total size of stored files is bounded; the least recently used URLs are
+evicted first.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+class PageCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=256 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "bodies"), exist_ok=True)
+        os.makedirs(os.path.join(root, "text"), exist_ok=True)
+        # Called from the event loop and from worker threads, so guard the connection
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(root, "pages.db"), check_same_thread=False, timeout=30)
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                last_access REAL
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access);
+            CREATE TABLE IF NOT EXISTS blobs (
+                path TEXT PRIMARY KEY,
+                hash TEXT NOT NULL,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS blobs_hash ON blobs(hash);
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    def _body_path(self, body_hash):
+        return os.path.join("bodies", body_hash)
+
+    def _text_path(self, body_hash, variant):
+        return os.path.join("text", f"{body_hash}.{variant}.txt")
+
+    def _write_blob(self, rel_path, body_hash, data):
+        full = os.path.join(self.root, rel_path)
+        tmp = full + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, full)
+        self.db.execute(
+            "INSERT OR REPLACE INTO blobs (path, hash, size) VALUES (?, ?, ?)",
+            (rel_path, body_hash, len(data)),
+        )
+
+    def lookup(self, url):
+        """Return (body_hash, etag, last_modified) for a URL whose body is still on disk"""
+        with self._lock:
+            row = self.db.execute(
+                "SELECT body_hash, etag, last_modified FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row and os.path.exists(os.path.join(self.root, self._body_path(row[0]))):
+            return row
+        return None
+
+    def page_size(self, url):
+        """Bytes of the cached body for a URL, or None"""
+        with self._lock:
+            row = self.db.execute("SELECT body_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            if row:
+                row = self.db.execute("SELECT size FROM blobs WHERE path = ?", (self._body_path(row[0]),)).fetchone()
+        return row[0] if row else None
+
+    def conditional_headers(self, url):
+        entry = self.lookup(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry[1]:
+            headers["If-None-Match"] = entry[1]
+        if entry[2]:
+            headers["If-Modified-Since"] = entry[2]
+        return headers
+
+    def touch(self, url):
+        """Mark a URL as fresh after a 304; returns its body hash"""
+        with self._lock:
+            self.db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+            self.db.commit()
+            row = self.db.execute("SELECT body_hash FROM pages WHERE url = ?", (url,)).fetchone()
+        self.hits += 1
+        return row[0] if row else None
+
+    def store(self, url, body, etag=None, last_modified=None):
+        body_hash = content_hash(body)
+        now = time.time()
+        with self._lock:
+            if not os.path.exists(os.path.join(self.root, self._body_path(body_hash))):
+                self._write_blob(self._body_path(body_hash), body_hash, body)
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages (url, body_hash, etag, last_modified, fetched_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, body_hash, etag, last_modified, now, now),
+            )
+            self.db.commit()
+        self.misses += 1
+        self.evict()
+        return body_hash
+
+    def read_body(self, body_hash):
+        with open(os.path.join(self.root, self._body_path(body_hash)), "rb") as f:
+            return f.read()
+
+    def get_text(self, body_hash, variant="default"):
+        try:
+            with open(os.path.join(self.root, self._text_path(body_hash, variant)), encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put_text(self, body_hash, text, variant="default"):
+        with self._lock:
+            self._write_blob(self._text_path(body_hash, variant), body_hash, text.encode("utf-8"))
+            self.db.commit()
+
+    def total_bytes(self):
+        with self._lock:
+            return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used URLs until the stored files fit in max_bytes"""
+        with self._lock:
+            total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            while total > self.max_bytes:
+                oldest = self.db.execute(
+                    "SELECT url, body_hash FROM pages ORDER BY last_access LIMIT 1"
+                ).fetchone()
+                if not oldest:
+                    break
+                url, body_hash = oldest
+                self.db.execute("DELETE FROM pages WHERE url = ?", (url,))
+                still_used = self.db.execute(
+                    "SELECT 1 FROM pages WHERE body_hash = ? LIMIT 1", (body_hash,)
+                ).fetchone()
+                if still_used:
+                    continue
+                for path, size in self.db.execute(
+                    "SELECT path, size FROM blobs WHERE hash = ?", (body_hash,)
+                ).fetchall():
+                    try:
+                        os.remove(os.path.join(self.root, path))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                self.db.execute("DELETE FROM blobs WHERE hash = ?", (body_hash,))
+            self.db.commit()
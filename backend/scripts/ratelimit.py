@@ -0,0 +1,206 @@
+"""Token-bucket rate limiting for the scraper.
+
+One bucket per key (a model ID or a scraped host). Buckets refill at a steady
+rate, 429s push a bucket into backoff, and Retry-After / X-RateLimit-* headers
+override our own guesses whenever the server sends them.
+
+Time comes from a clock object so the whole thing can be driven offline with
+FakeClock instead of waiting on the wall clock.
+"""
+
+import asyncio
+import heapq
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+
+
+class MonotonicClock:
+    def now(self):
+        return time.monotonic()
+
+    def wall(self):
+        return time.time()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class FakeClock:
+    """Manual clock for offline tests: sleepers only wake when advance() is called"""
+
+    def __init__(self, start=0.0, wall_start=1_700_000_000.0):
+        self.t = start
+        self.wall_offset = wall_start - start
+        self.sleeps = []
+        self._waiters = []
+        self._seq = 0
+
+    def now(self):
+        return self.t
+
+    def wall(self):
+        return self.t + self.wall_offset
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        if seconds <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (self.t + seconds, self._seq, future))
+        await future
+
+    def advance(self, seconds):
+        self.t += seconds
+        while self._waiters and self._waiters[0][0] <= self.t:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = float(capacity)
+        self.updated = clock.now()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = self.clock.now()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, n=1):
+        """Seconds until n tokens can be taken (0 if available right now)"""
+        self._refill()
+        blocked = max(0.0, self.blocked_until - self.clock.now())
+        missing = max(0.0, n - self.tokens)
+        return max(blocked, missing / self.rate if self.rate else float("inf"))
+
+    def try_acquire(self, n=1):
+        if self.wait_time(n) > 0:
+            return False
+        self.tokens -= n
+        return True
+
+    def block_for(self, seconds):
+        self._refill()
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, self.clock.now() + seconds)
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_reset(value, wall_now):
+    """X-RateLimit-Reset comes as an epoch (s or ms), a delta in seconds or '1m30s'"""
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        if not parts:
+            return None
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts)
+    if number > 1e12:  # epoch milliseconds (OpenRouter)
+        return max(0.0, number / 1000 - wall_now)
+    if number > 1e9:  # epoch seconds
+        return max(0.0, number - wall_now)
+    return number
+
+
+def parse_retry_after(headers, wall_now=None):
+    """Return how long the server asked us to wait, or None if it didn't say"""
+    if not headers:
+        return None
+    wall_now = time.time() if wall_now is None else wall_now
+    headers = {k.lower(): v for k, v in dict(headers).items()}
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - wall_now)
+            except (TypeError, ValueError):
+                pass
+
+    remaining = headers.get("x-ratelimit-remaining") or headers.get("x-ratelimit-remaining-requests")
+    reset = headers.get("x-ratelimit-reset") or headers.get("x-ratelimit-reset-requests")
+    if reset and remaining is not None and remaining.strip() in ("0", "0.0"):
+        return _parse_reset(reset, wall_now)
+    return None
+
+
+class RateLimiter:
+    """Lazily creates a TokenBucket per key and applies jittered exponential backoff"""
+
+    def __init__(self, rate_per_min, burst=1, clock=None, base_backoff=2.0, max_backoff=120.0, rng=None):
+        self.rate = rate_per_min / 60.0
+        self.burst = burst
+        self.clock = clock or MonotonicClock()
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.rng = rng or random.Random()
+        self.buckets = {}
+        self.failures = {}
+
+    def bucket(self, key):
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(self.rate, self.burst, self.clock)
+        return self.buckets[key]
+
+    def wait_time(self, key):
+        return self.bucket(key).wait_time()
+
+    async def acquire(self, key):
+        bucket = self.bucket(key)
+        while not bucket.try_acquire():
+            await self.clock.sleep(bucket.wait_time())
+
+    async def acquire_any(self, keys):
+        """Take a token from whichever key has budget first; ties go to the earlier key"""
+        keys = list(keys)
+        while True:
+            waits = [(self.wait_time(key), i) for i, key in enumerate(keys)]
+            wait, i = min(waits)
+            if wait <= 0 and self.bucket(keys[i]).try_acquire():
+                return keys[i]
+            await self.clock.sleep(max(wait, 0.0))
+
+    def try_acquire_any(self, keys):
+        """Non-blocking acquire_any: the first key with budget right now, or None"""
+        for key in keys:
+            if self.bucket(key).try_acquire():
+                return key
+        return None
+
+    def backoff_delay(self, key):
+        # "Equal jitter": half the exponential step is fixed, the other half random
+        step = min(self.max_backoff, self.base_backoff * 2 ** self.failures.get(key, 0))
+        return step / 2 + self.rng.uniform(0, step / 2)
+
+    def penalize(self, key, headers=None):
+        """Record a 429 for key; returns the delay we backed off for"""
+        delay = parse_retry_after(headers, self.clock.wall())
+        if delay is None:
+            delay = self.backoff_delay(key)
+        self.failures[key] = self.failures.get(key, 0) + 1
+        self.bucket(key).block_for(delay)
+        return delay
+
+    def observe(self, key, headers):
+        """Honor rate-limit headers on a successful response (remaining == 0)"""
+        delay = parse_retry_after(headers, self.clock.wall())
+        if delay:
+            self.bucket(key).block_for(delay)
+
+    def reward(self, key):
+        self.failures.pop(key, None)
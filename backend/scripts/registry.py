@@ -0,0 +1,213 @@
+"""Where the scraper's targets come from.
+
+A target is one (company, profile) page:
+
+    {"company": "Meta", "profile": "Frontend Engineer", "url": "https://...",
+     "priority": 0, "refresh_days": 30, "host": "www.geeksforgeeks.org"}
+
+Only company, profile and url are required; priority defaults to 0 (higher
+runs first within a batch), refresh_days to the scraper's REFRESH_DAYS and
+host to the url's hostname. "enabled": false parks a target.
+
+Sources are read as a stream, one target at a time:
+
+- a .jsonl file (one target per line; blank and # lines are skipped), the
+  default being targets.jsonl next to this file;
+- a .yaml/.yml file holding one target per document, or lists of them
+  (needs PyYAML);
+- "mongo": the brainwave.scrape_targets collection, highest priority
+  first, with the priority filter pushed into the query.
+
+Filters and --shard i/N are applied while reading; a shard is a stable hash
+of (company, profile), so every worker agrees on it without coordination.
+
+    python scripts/registry.py [--targets SOURCE] [--shard 0/4] [--company Meta]
+    python scripts/registry.py --import targets.jsonl   # load a file into scrape_targets
+"""
+
+import hashlib
+import json
+import os
+from urllib.parse import urlsplit
+
+DEFAULT_TARGETS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "targets.jsonl")
+
+
+def parse_shard(spec):
+    """'i/N' -> (i, N)"""
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"shard must look like i/N, got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be in 0..{count - 1}, got {spec!r}")
+    return index, count
+
+
+def shard_of(target, count):
+    digest = hashlib.md5(f"{target['company']}\0{target['profile']}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count
+
+
+def normalize(raw, default_refresh_days=30.0):
+    """A complete target dict from a registry record; ValueError if it can't be used"""
+    if not isinstance(raw, dict):
+        raise ValueError("target must be an object")
+    missing = [k for k in ("company", "profile", "url") if not raw.get(k)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    target = {k: v for k, v in raw.items() if k != "_id"}
+    target["priority"] = int(raw.get("priority") or 0)
+    target["refresh_days"] = float(raw.get("refresh_days") or default_refresh_days)
+    target["host"] = raw.get("host") or urlsplit(raw["url"]).hostname
+    return target
+
+
+class Filters:
+    def __init__(self, companies=(), hosts=(), min_priority=None, shard=None):
+        self.companies = {c.lower() for c in companies}
+        self.hosts = {h.lower() for h in hosts}
+        self.min_priority = min_priority
+        self.shard = shard  # (index, count) or None
+
+    def match(self, target):
+        if target.get("enabled") is False:
+            return False
+        if self.companies and target["company"].lower() not in self.companies:
+            return False
+        if self.hosts and (target["host"] or "").lower() not in self.hosts:
+            return False
+        if self.min_priority is not None and target["priority"] < self.min_priority:
+            return False
+        if self.shard and shard_of(target, self.shard[1]) != self.shard[0]:
+            return False
+        return True
+
+    def mongo_query(self):
+        """The part of the filter Mongo can apply itself (case-sensitive, so it only narrows)"""
+        query = {"enabled": {"$ne": False}}
+        if self.min_priority is not None:
+            query["priority"] = {"$gte": self.min_priority}
+        return query
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"   ⚠️ {os.path.basename(path)}:{n}: {e.msg}, skipping")
+
+
+def read_yaml(path):
+    import yaml
+
+    with open(path) as f:
+        for doc in yaml.safe_load_all(f):
+            if isinstance(doc, list):
+                yield from doc
+            elif doc is not None:
+                yield doc
+
+
+def read_mongo(collection, filters):
+    cursor = collection.find(filters.mongo_query()).sort("priority", -1).batch_size(500)
+    yield from cursor
+
+
+class Registry:
+    """Streams normalized, filtered targets from a source and counts what it saw"""
+
+    def __init__(self, source=None, collection=None, filters=None, default_refresh_days=30.0):
+        self.source = source or DEFAULT_TARGETS
+        self.collection = collection
+        self.filters = filters or Filters()
+        self.default_refresh_days = default_refresh_days
+        self.read = 0
+        self.matched = 0
+        self.invalid = 0
+
+    def _records(self):
+        if self.source == "mongo":
+            if self.collection is None:
+                raise ValueError("the mongo target registry needs MONGODB_URI")
+            return read_mongo(self.collection, self.filters)
+        if self.source.endswith((".yaml", ".yml")):
+            return read_yaml(self.source)
+        return read_jsonl(self.source)
+
+    def __iter__(self):
+        for raw in self._records():
+            self.read += 1
+            try:
+                target = normalize(raw, self.default_refresh_days)
+            except (TypeError, ValueError) as e:
+                self.invalid += 1
+                print(f"   ⚠️ Skipping bad target #{self.read}: {e}")
+                continue
+            if self.filters.match(target):
+                self.matched += 1
+                yield target
+
+    def batches(self, size):
+        """Lists of up to size targets, read lazily"""
+        batch = []
+        for target in self:
+            batch.append(target)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List or import scraper targets")
+    parser.add_argument("--targets", default=os.getenv("SCRAPER_TARGETS", DEFAULT_TARGETS),
+                        help="targets .jsonl/.yaml file, or 'mongo'")
+    parser.add_argument("--shard", help="i/N: only targets in shard i of N")
+    parser.add_argument("--company", action="append", default=[])
+    parser.add_argument("--host", action="append", default=[])
+    parser.add_argument("--min-priority", type=int)
+    parser.add_argument("--import", dest="import_file", help="upsert this .jsonl/.yaml file into scrape_targets")
+    args = parser.parse_args()
+
+    collection = None
+    if args.targets == "mongo" or args.import_file:
+        from dotenv import load_dotenv
+        from pymongo import ASCENDING, MongoClient, UpdateOne
+
+        load_dotenv(os.path.join(os.path.dirname(__file__), '../.env'))
+        collection = MongoClient(os.getenv("MONGODB_URI"))["brainwave"]["scrape_targets"]
+
+    if args.import_file:
+        collection.create_index([("company", ASCENDING), ("profile", ASCENDING)], name="company_profile", unique=True)
+        collection.create_index([("priority", ASCENDING)], name="priority")
+        records = read_yaml(args.import_file) if args.import_file.endswith((".yaml", ".yml")) else read_jsonl(args.import_file)
+        ops = []
+        for raw in records:
+            normalize(raw)  # reject bad records, but store them as written so defaults stay defaults
+            ops.append(UpdateOne({"company": raw["company"], "profile": raw["profile"]}, {"$set": raw}, upsert=True))
+        if ops:
+            result = collection.bulk_write(ops, ordered=False)
+            print(f"✅ Imported {len(ops)} targets ({result.upserted_count} new, {result.modified_count} updated)")
+        return
+
+    try:
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    registry = Registry(args.targets, collection, Filters(args.company, args.host, args.min_priority, shard))
+    for target in registry:
+        print(f"{target['priority']:>4}  {target['company']:<20} {target['profile']:<30} {target['host']}")
+    print(f"📚 {registry.matched} of {registry.read} targets match ({registry.invalid} invalid)")
+
+
+if __name__ == "__main__":
+    main()
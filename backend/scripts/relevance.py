@@ -0,0 +1,108 @@
+"""Keep the question-like parts of a page and drop the rest before prompting.
+
+Cleaned page text still carries menus, ads, author bios and footers, and
+every character of it is paid for in prompt tokens. prefilter() cuts the
+text into passages (a heading-like line starts a new one, see
+chunking.is_heading, and long runs are cut at MAX_PASSAGE_CHARS), scores
+each with cheap lexical and structural features and keeps the best ones up
+to a token budget, in page order:
+
+- lines ending in "?", "Q12." / "12)" numbering, "A) ..." option lines and
+  "Answer:" / "Explanation:" markers raise the score;
+- code-looking lines (def/function/return, braces, semicolons) raise it a
+  little;
+- runs of very short lines (navigation) and boilerplate words (cookie,
+  subscribe, sponsored, about the author, ...) lower it.
+
+Scores are per line, so a long passage doesn't win on size alone. Passages
+scoring at or below MIN_SCORE are dropped even when the page fits the
+budget; a page where nothing scores above it is cut to the budget as before.
+"""
+
+import re
+
+from chunking import CHARS_PER_TOKEN, estimate_tokens, is_heading
+
+MAX_PASSAGE_CHARS = 1200
+MIN_SCORE = 0.0
+
+_NUMBERED = re.compile(r"^\s*(?:Q(?:uestion)?\s*\d+\s*[.:)-]|\d{1,3}[.)]\s)", re.I)
+_OPTION = re.compile(r"^\s*\(?[A-Da-d][.)]\s+\S")
+_ANSWER = re.compile(r"\b(?:answer|correct option|explanation|solution)\s*[:\-]", re.I)
+_CODE = re.compile(r"(^\s*(?:def|class|function|return|public|private|import|const|let|var|SELECT)\b|[{};]\s*$|=>|\(\)\s*[:{])")
+_BOILERPLATE = re.compile(
+    r"\b(?:cookies?|privacy policy|terms of (?:use|service)|subscribe|newsletter|sign (?:in|up)|log ?in|"
+    r"sponsored|advertisement|all rights reserved|copyright|follow us|share (?:this|on)|about the author|"
+    r"related (?:posts|articles)|read more|last updated|min read)\b",
+    re.I,
+)
+
+
+def split_passages(text, max_chars=MAX_PASSAGE_CHARS):
+    passages, current, size = [], [], 0
+    for line in text.splitlines():
+        if current and (is_heading(line) or size + len(line) > max_chars):
+            passages.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+def score(passage):
+    lines = [line.strip() for line in passage.splitlines() if line.strip()]
+    if not lines:
+        return MIN_SCORE
+    value = 0.0
+    short = 0
+    for line in lines:
+        if "?" in line:
+            value += 3
+        if _NUMBERED.match(line):
+            value += 2
+        if _OPTION.match(line):
+            value += 2
+        if _ANSWER.search(line):
+            value += 2
+        if _CODE.search(line):
+            value += 1
+        if len(line.split()) <= 3:
+            short += 1
+        value -= 3 * len(_BOILERPLATE.findall(line))
+    value /= len(lines)
+    # A run of one-to-three word lines is a menu, tag cloud or footer
+    if len(lines) >= 4 and short / len(lines) > 0.6:
+        value -= 2
+    return value
+
+
+def prefilter(text, budget_tokens, min_score=MIN_SCORE):
+    """(kept text, stats): the best-scoring passages that fit the budget, in page order"""
+    passages = split_passages(text)
+    scored = sorted(
+        ((score(p), i, p) for i, p in enumerate(passages)),
+        key=lambda s: (-s[0], s[1]),
+    )
+    keep, used = [], 0
+    for value, i, passage in scored:
+        if value <= min_score:
+            break
+        cost = estimate_tokens(passage)
+        if used + cost > budget_tokens:
+            continue  # a smaller passage further down may still fit
+        keep.append(i)
+        used += cost
+    kept = "\n".join(passages[i] for i in sorted(keep))
+    if not kept:
+        # Nothing looks like questions (plain prose?): fall back to the page's opening text
+        kept = text[:budget_tokens * CHARS_PER_TOKEN]
+    stats = {
+        "passages": len(passages),
+        "kept": len(keep),
+        "tokens_in": estimate_tokens(text),
+        "tokens_out": estimate_tokens(kept) if kept else 0,
+        "fallback": not keep,
+    }
+    return kept, stats
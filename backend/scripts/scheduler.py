@@ -0,0 +1,153 @@
+"""Spend a run's tokens on the targets whose data they improve most.
+
+Due targets are ranked by value per 1k estimated tokens:
+
+    value = importance * (staleness + deficit)
+
+- importance: 1 + priority for priority >= 0, 1 / (1 - priority) below;
+- staleness: age of the stored data over the target's refresh interval,
+  capped at MAX_STALENESS (never scraped counts as the cap);
+- deficit: the share of min_questions still missing (0..1).
+
+A target's cost is the tokens its last crawl used (recorded in the work
+queue) when known, else an estimate from its cached page size, else
+DEFAULT_COST. A page is never sent in full past the pre-filter budget,
+so estimates are capped at what one page can cost.
+
+TokenBudget keeps a per-day ledger in SQLite (shared by every process on the
+machine) with a daily allowance and a per-run allowance. Targets are
+admitted in rank order only while their estimate fits what is left;
+whatever the previous day left unspent is carried over, up to carry_days
+days of allowance.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from work_queue import parse_scraped_at
+
+MAX_STALENESS = 3.0
+DEFAULT_COST = 5000
+HTML_TEXT_RATIO = 0.2  # cleaned text is roughly this share of the HTML bytes
+COMPLETION_TOKENS_PER_QUESTION = 100
+PROMPT_OVERHEAD = 80  # system message and instructions, per completion
+
+
+def importance(priority):
+    return 1 + priority if priority >= 0 else 1 / (1 - priority)
+
+
+def value(target, row, stored, min_questions, now=None):
+    """How much crawling the target now would improve the stored data"""
+    now = time.time() if now is None else now
+    refresh = target["refresh_days"] * 24 * 3600
+    written = [t for t in (parse_scraped_at((stored or {}).get("scraped_at")), row and row["written_at"]) if t]
+    staleness = min(MAX_STALENESS, (now - max(written)) / refresh) if written else MAX_STALENESS
+    count = (stored or {}).get("count")
+    if count is None:
+        count = len((row or {}).get("questions") or [])
+    deficit = max(0, min_questions - count) / max(min_questions, 1)
+    return importance(target["priority"]) * (staleness + deficit)
+
+
+def estimate_cost(row, page_bytes, prompt_tokens, question_count, chunk_tokens):
+    """Tokens one crawl of the target is expected to use"""
+    if row and row.get("tokens_used"):
+        return row["tokens_used"]
+    if not page_bytes:
+        return DEFAULT_COST
+    text_tokens = min(prompt_tokens, int(page_bytes * HTML_TEXT_RATIO) // 4 + 1)
+    chunks = -(-text_tokens // chunk_tokens)
+    return text_tokens + chunks * PROMPT_OVERHEAD + question_count * COMPLETION_TOKENS_PER_QUESTION
+
+
+def rank(scored):
+    """[(target, value, cost)] -> same, most value per token first; priority then order break ties"""
+    return sorted(scored, key=lambda s: (-s[1] * 1000 / max(s[2], 1), -s[0]["priority"]))
+
+
+class TokenBudget:
+    def __init__(self, path, daily=None, per_run=None, carry_days=1.0, clock=time.time):
+        self.daily = daily
+        self.per_run = per_run
+        self.clock = clock
+        self.day = time.strftime("%Y-%m-%d", time.localtime(clock()))
+        self.reserved = 0
+        self.run_spent = 0
+        self.admitted = 0
+        self.deferred = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS days (
+                day TEXT PRIMARY KEY,
+                allowance REAL,
+                spent INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self.carried = 0
+        if daily is not None:
+            last = self.db.execute(
+                "SELECT allowance, spent FROM days WHERE day < ? ORDER BY day DESC LIMIT 1", (self.day,)
+            ).fetchone()
+            if last and last[0] is not None:
+                self.carried = min(carry_days * daily, max(0, last[0] - last[1]))
+            self.db.execute("INSERT OR IGNORE INTO days (day, allowance) VALUES (?, ?)",
+                            (self.day, daily + self.carried))
+            # A row made by a run without a daily limit gets one now
+            self.db.execute("UPDATE days SET allowance = ? WHERE day = ? AND allowance IS NULL",
+                            (daily + self.carried, self.day))
+        else:
+            self.db.execute("INSERT OR IGNORE INTO days (day) VALUES (?)", (self.day,))
+        self.db.commit()
+
+    @property
+    def limited(self):
+        return self.daily is not None or self.per_run is not None
+
+    def today(self):
+        """(allowance or None, spent) for today, as every process has booked it"""
+        with self._lock:
+            return self.db.execute("SELECT allowance, spent FROM days WHERE day = ?", (self.day,)).fetchone()
+
+    def remaining(self):
+        """Tokens that may still be admitted, or None without a limit"""
+        left = []
+        if self.daily is not None:
+            allowance, spent = self.today()
+            left.append(allowance - spent - self.reserved)
+        if self.per_run is not None:
+            left.append(self.per_run - self.run_spent - self.reserved)
+        return min(left) if left else None
+
+    def admit(self, estimate):
+        remaining = self.remaining()
+        if remaining is not None and estimate > remaining:
+            self.deferred += 1
+            return False
+        self.reserved += estimate
+        self.admitted += 1
+        return True
+
+    def exhausted(self):
+        """True once actual spend alone has used up a limit"""
+        left = []
+        if self.daily is not None:
+            allowance, spent = self.today()
+            left.append(allowance - spent)
+        if self.per_run is not None:
+            left.append(self.per_run - self.run_spent)
+        return bool(left) and min(left) <= 0
+
+    def settle(self, estimate, actual):
+        """Release a target's reservation and book what it really used"""
+        self.reserved -= estimate
+        self.run_spent += actual
+        if actual:
+            with self._lock:
+                self.db.execute("UPDATE days SET spent = spent + ? WHERE day = ?", (actual, self.day))
+                self.db.commit()
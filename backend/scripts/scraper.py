@@ -149,14 +149,31 @@
 # print(f"\n🎉 Scraper Finished!")
 
 import os
-import json
+import sys
 import time
-import re
-import requests
-from bs4 import BeautifulSoup
+import math
+import random
+import asyncio
+import argparse
+import contextvars
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
-from pymongo import MongoClient
-from openai import OpenAI
+from ratelimit import RateLimiter
+from page_cache import PageCache, DEFAULT_CACHE_DIR
+from llm_cache import CompletionCache
+from extractors import get_extractor, BACKENDS
+from json_stream import KeyedMCQStreamParser, MCQStreamParser
+from model_health import ModelHealth
+from chunking import estimate_tokens, merge_questions, split_chunks
+from dedup import DedupIndex, build_index
+from work_queue import WorkQueue
+from metrics import Metrics
+from validation import repair_prompt, validate
+from registry import DEFAULT_TARGETS, Filters, Registry, parse_shard
+from packing import PromptPacker
+from relevance import prefilter
+from scheduler import TokenBudget, estimate_cost, rank, value
+from model_probe import DEFAULT_MODELS, probe, read_manifest, write_manifest
 
 # 1. LOAD CONFIG
 load_dotenv(os.path.join(os.path.dirname(__file__), '../.env'))
@@ -164,189 +181,998 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '../.env'))
 openrouter_key = os.getenv("OPENROUTER_API_KEY")
 mongo_uri = os.getenv("MONGODB_URI")
 
-if not openrouter_key:
-    print("❌ Error: OPENROUTER_API_KEY not found in .env")
-    exit()
+# openai, httpx and pymongo are imported, and their clients created, on first
+# use: importing them is most of a cold start, and runs with nothing due never need them
+_client = None
+
+def get_client():
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        _client = AsyncOpenAI(
+            base_url=os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+            api_key=openrouter_key,
+        )
+    return _client
+
+# How many page downloads / LLM completions may be in flight at once.
+# Fetches are cheap and I/O bound; completions are what the free tier limits.
+FETCH_CONCURRENCY = int(os.getenv("SCRAPER_FETCH_CONCURRENCY", "8"))
+LLM_CONCURRENCY = int(os.getenv("SCRAPER_LLM_CONCURRENCY", "3"))
+
+# Hedging: if the in-flight model hasn't answered by its p90 latency, start the
+# next model in parallel and keep whichever answers first. MAX_HEDGES caps the
+# extra completions a single target may start.
+HEDGE_PERCENTILE = float(os.getenv("SCRAPER_HEDGE_PERCENTILE", "90"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("SCRAPER_HEDGE_DELAY", "25"))
+MAX_HEDGES = int(os.getenv("SCRAPER_MAX_HEDGES", "1"))
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
+
+# HTML -> text backend: auto | selectolax | lxml | reference (the original BeautifulSoup path)
+extractor_name, extract_text = get_extractor(os.getenv("SCRAPER_EXTRACTOR", "auto"))
+
+# Request budgets per model ID and per scraped host (requests per minute).
+# OpenRouter's free tier allows ~20 RPM per model; 429s and rate-limit headers
+# push a bucket into backoff, so these are just the steady-state pace.
+model_limiter = RateLimiter(float(os.getenv("SCRAPER_MODEL_RPM", "20")), burst=2)
+host_limiter = RateLimiter(float(os.getenv("SCRAPER_HOST_RPM", "30")), burst=4)
+
+# Local page cache: unchanged pages come back as 304s and skip HTML cleaning
+CACHE_DIR = os.getenv("SCRAPER_CACHE_DIR", DEFAULT_CACHE_DIR)
+page_cache = PageCache(os.path.join(CACHE_DIR, "pages"), int(os.getenv("SCRAPER_PAGE_CACHE_MB", "256")) * 1024 * 1024)
+
+# Completions keyed by (model, prompt); --no-cache / --refresh switch it off per run
+llm_cache = CompletionCache(
+    os.path.join(CACHE_DIR, "completions.db"),
+    ttl_seconds=float(os.getenv("SCRAPER_LLM_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+    max_entries=int(os.getenv("SCRAPER_LLM_CACHE_MAX_ENTRIES", "5000")),
+)
 
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=openrouter_key,
+# Targets are refreshed once their data is older than REFRESH_DAYS; partial
+# results (< MIN_QUESTIONS) and failures are retried up to MAX_RETRIES times
+REFRESH_DAYS = float(os.getenv("SCRAPER_REFRESH_DAYS", "30"))
+MIN_QUESTIONS = int(os.getenv("SCRAPER_MIN_QUESTIONS", "10"))
+MAX_RETRIES = int(os.getenv("SCRAPER_MAX_RETRIES", "3"))
+
+# Per-target checkpoints so a crashed run resumes each target at its last stage
+work_queue = WorkQueue(
+    os.path.join(CACHE_DIR, "work_queue.db"),
+    refresh_seconds=REFRESH_DAYS * 24 * 3600,
+    min_questions=MIN_QUESTIONS,
+    max_retries=MAX_RETRIES,
 )
 
-# 2. SETUP MONGODB
-if not mongo_uri:
-    print("⚠️  Warning: MONGODB_URI not set. Data will not be saved.")
-    collection = None
-else:
-    try:
-        mongo_client = MongoClient(mongo_uri)
-        db = mongo_client["brainwave"]
-        collection = db["mocktest_data"]
-        print("✅ Connected to MongoDB.")
-    except Exception as e:
-        print(f"❌ MongoDB Connection Failed: {e}")
-        exit()
+# Rolling latency / success / 429 stats and circuit breakers per model, kept across runs
+model_health = ModelHealth(os.path.join(CACHE_DIR, "model_health.json"))
+
+# Timing spans and counters per stage; main() replaces this with one using the run's trace/profile options
+metrics = Metrics()
+
+# 2. SETUP MONGODB (on first use)
+_mongo = None  # (round-trip counter, brainwave db) once set up
+
+def mongo_db():
+    """The brainwave database, or None without MONGODB_URI"""
+    global _mongo
+    if _mongo is None:
+        if not mongo_uri:
+            print("⚠️  Warning: MONGODB_URI not set. Data will not be saved.")
+            _mongo = (None, None)
+        else:
+            from pymongo import MongoClient
+            from mongo_writer import RoundTripCounter
+
+            try:
+                round_trips = RoundTripCounter()
+                mongo_client = MongoClient(mongo_uri, event_listeners=[round_trips])
+                _mongo = (round_trips, mongo_client["brainwave"])
+                print("✅ Connected to MongoDB.")
+            except Exception as e:
+                print(f"❌ MongoDB Connection Failed: {e}")
+                exit()
+    return _mongo[1]
+
+def mongo_collection():
+    db = mongo_db()
+    return None if db is None else db["mocktest_data"]
+
+QUESTION_COUNT = 15
+
+# Long pages: keep up to PAGE_CHARS of text, cut it into CHUNK_TOKENS windows
+# (the old single-prompt size) and ask for a share of the MCQs from each one
+PAGE_CHARS = int(os.getenv("SCRAPER_PAGE_CHARS", "32000"))
+CHUNK_TOKENS = int(os.getenv("SCRAPER_CHUNK_TOKENS", "2000"))
+MAX_CHUNKS = int(os.getenv("SCRAPER_MAX_CHUNKS", "4"))
+
+# Before prompting, only the most question-like passages of a page are kept,
+# up to PREFILTER_TOKENS (see relevance.py); --no-prefilter sends the page as is
+PREFILTER_TOKENS = int(os.getenv("SCRAPER_PREFILTER_TOKENS", "4000"))
+
+# Token budgets: a run admits due targets, best value per token first, only
+# while their estimated cost fits what is left of the run's budget and of the
+# day's (SCRAPER_DAILY_TOKENS plus up to BUDGET_CARRY_DAYS of unspent allowance)
+RUN_TOKENS = int(os.getenv("SCRAPER_RUN_TOKENS", "0")) or None
+DAILY_TOKENS = int(os.getenv("SCRAPER_DAILY_TOKENS", "0")) or None
+BUDGET_CARRY_DAYS = float(os.getenv("SCRAPER_BUDGET_CARRY_DAYS", "1"))
+
+# Tokens used on behalf of the target being processed (set per target task in process_target)
+target_usage = contextvars.ContextVar("target_usage", default=None)
+
+# Upserts are buffered and sent with bulk_write by size or age
+MONGO_BATCH_SIZE = int(os.getenv("SCRAPER_MONGO_BATCH", "20"))
+MONGO_FLUSH_SECONDS = float(os.getenv("SCRAPER_MONGO_FLUSH_SECONDS", "5"))
+
+# Invalid or missing MCQs are re-asked with a short prompt (at most REPAIR_ROUNDS
+# times per page, with REPAIR_CHARS of source text) instead of redoing the page
+REPAIR_ROUNDS = int(os.getenv("SCRAPER_REPAIR_ROUNDS", "1"))
+REPAIR_CHARS = int(os.getenv("SCRAPER_REPAIR_CHARS", "3000"))
+
+# --pack: pages of at most PACK_TARGET_TOKENS share completions, up to PACK_MAX_TARGETS
+# or PACK_TOKENS of page text per request, waiting at most PACK_DELAY seconds for company
+PACK_TARGET_TOKENS = int(os.getenv("SCRAPER_PACK_TARGET_TOKENS", "1500"))
+PACK_TOKENS = int(os.getenv("SCRAPER_PACK_TOKENS", "6000"))
+PACK_MAX_TARGETS = int(os.getenv("SCRAPER_PACK_MAX_TARGETS", "4"))
+PACK_DELAY = float(os.getenv("SCRAPER_PACK_DELAY", "2"))
+
+# Estimated Jaccard similarity above which a new MCQ counts as already stored
+DEDUP_THRESHOLD = float(os.getenv("SCRAPER_DEDUP_THRESHOLD", "0.7"))
+
+# --worker: a target's lease lasts LEASE_SECONDS and is renewed every third of
+# that while held, so a crashed worker's targets are picked up again after it
+LEASE_SECONDS = float(os.getenv("SCRAPER_LEASE_SECONDS", "300"))
 
 # 3. ROBUST MODEL LIST
-FALLBACK_MODELS = [
-    # Primary: Fast Google Models
-    "google/gemini-2.0-flash-exp:free",
-    "google/gemini-2.0-pro-exp-02-05:free",
-    
-    # Secondary: Reliable Open Source (Different Providers)
-    "meta-llama/llama-3.3-70b-instruct:free",
-    "deepseek/deepseek-r1:free",
-    "microsoft/phi-3-mini-128k-instruct:free",
-    
-    # Last Resort
-    "openrouter/auto"
-]
+# main() replaces this with the ranked models of the probe manifest written by
+# check_models.py while it is fresh; SCRAPER_AUTO_PROBE=1 probes when it isn't
+FALLBACK_MODELS = list(DEFAULT_MODELS)
+MODEL_MANIFEST = os.path.join(CACHE_DIR, "models.json")
+AUTO_PROBE = os.getenv("SCRAPER_AUTO_PROBE") == "1"
+MANIFEST_TTL_HOURS = float(os.getenv("SCRAPER_MODEL_MANIFEST_TTL_HOURS", "24"))
+
+async def load_models():
+    models, stale = read_manifest(MODEL_MANIFEST)
+    if models:
+        print(f"🩺 Using {len(models)} probed models from {MODEL_MANIFEST}")
+        return models
+    if AUTO_PROBE:
+        print(f"🩺 {stale.capitalize()}, probing models...")
+        manifest = await probe(get_client(), ttl_hours=MANIFEST_TTL_HOURS)
+        write_manifest(MODEL_MANIFEST, manifest)
+        if manifest["ranked"]:
+            return manifest["ranked"]
+        stale = "no probed model answered"
+    print(f"⚠️  {stale.capitalize()}; using the built-in model list (run check_models.py to probe)")
+    return list(DEFAULT_MODELS)
+
+def cached_text(body_hash):
+    # Backends differ slightly in output, so cleaned text is cached per backend and budget
+    variant = f"{extractor_name}-{PAGE_CHARS}"
+    text = page_cache.get_text(body_hash, variant)
+    if text is None:
+        metrics.count("cache", cache="text", result="miss")
+        with metrics.span("clean", extractor=extractor_name):
+            text = extract_text(page_cache.read_body(body_hash), PAGE_CHARS)
+        page_cache.put_text(body_hash, text, variant)
+    else:
+        metrics.count("cache", cache="text", result="hit")
+    return text
 
-def extract_json(text):
+async def get_website_text(http, url):
+    """Returns (text, content_hash) for a page, revalidating the local cache copy"""
+    host = urlsplit(url).hostname
     try:
-        match = re.search(r'\[.*\]', text, re.DOTALL)
-        if match:
-            return json.loads(match.group())
-        return json.loads(text)
-    except:
-        return None
-
-def get_website_text(url):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-        response = requests.get(url, headers=headers, timeout=15)
-        soup = BeautifulSoup(response.content, 'html.parser')
-        for script in soup(["script", "style", "nav", "footer"]):
-            script.extract()
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        return text[:12000] 
+        for _ in range(3):
+            with metrics.span("rate_wait", limiter="host"):
+                await host_limiter.acquire(host)
+            with metrics.span("fetch", host=host) as span:
+                response = await http.get(url, headers=page_cache.conditional_headers(url))
+                span["status"] = response.status_code
+            if response.status_code in (429, 503):
+                metrics.count("rate_limited", limiter="host")
+                delay = host_limiter.penalize(host, response.headers)
+                print(f"   ⏳ {host} is throttling us. Backing off {delay:.0f}s...")
+                continue
+            host_limiter.reward(host)
+            if response.status_code == 304:
+                metrics.count("cache", cache="page", result="hit")
+                body_hash = page_cache.touch(url)
+            else:
+                response.raise_for_status()
+                metrics.count("cache", cache="page", result="miss")
+                body_hash = await asyncio.to_thread(
+                    page_cache.store, url, response.content,
+                    response.headers.get("etag"), response.headers.get("last-modified")
+                )
+            # Parsing is CPU bound, keep it off the event loop so other fetches progress
+            return await asyncio.to_thread(cached_text, body_hash), body_hash
+        print(f"   Scrape Error: still rate limited by {host}")
+        return None, None
     except Exception as e:
         print(f"   Scrape Error: {e}")
-        return None
+        return None, None
 
-def get_questions_safe(content, profile):
-    """Tries models with delays and retries"""
-    prompt = f"""
-    Extract 15 technical MCQs for {profile} from this text.
+async def stream_questions(model_id, messages, count=QUESTION_COUNT, parser_cls=MCQStreamParser):
+    """Streams one completion, collecting MCQs as each object closes.
+
+    Returns (response_text, questions, usage). If the stream breaks off,
+    whatever complete items arrived are still returned. usage is only known
+    when the stream ran to the end.
+    """
+    raw = await get_client().chat.completions.with_raw_response.create(
+        model=model_id,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    model_limiter.observe(model_id, raw.headers)
+    stream = raw.parse()
+    parser = parser_cls()
+    pieces = []
+    questions = []
+    usage = None
+    parse_seconds = 0.0  # JSON extraction is interleaved with the stream, so it is summed per call
+    try:
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            pieces.append(delta)
+            started = time.perf_counter()
+            questions.extend(parser.feed(delta))
+            parse_seconds += time.perf_counter() - started
+            # Array closed or we have enough: stop paying for trailing tokens
+            if parser.done or len(questions) >= count:
+                break
+    except Exception:
+        if not questions:
+            raise
+        print(f"   ⚠️ {model_id} stream broke off, keeping {len(questions)} complete items")
+    finally:
+        await stream.close()
+        metrics.observe("json_parse", parse_seconds, model=model_id, items=len(questions))
+    return "".join(pieces), questions, usage
+
+def hedge_delay(model_id):
+    """Seconds to wait on model_id before hedging: its HEDGE_PERCENTILE latency so far"""
+    delay = model_health.percentile(model_id, HEDGE_PERCENTILE)
+    return HEDGE_DEFAULT_DELAY if delay is None else delay
+
+async def timed_attempt(model_id, messages, count, parser_cls=MCQStreamParser):
+    started = time.perf_counter()
+    with metrics.span("llm_attempt", model=model_id) as span:
+        response_text, questions, usage = await stream_questions(model_id, messages, count, parser_cls)
+        span["questions"] = len(questions)
+    return response_text, questions, usage, time.perf_counter() - started
+
+def usage_cost(usage, messages, response_text):
+    """(tokens, cost) from the provider's usage block, or a chars/4 estimate"""
+    if usage:
+        return usage.total_tokens, getattr(usage, "cost", None) or 0.0
+    chars = sum(len(m["content"]) for m in messages) + len(response_text or "")
+    return chars // 4, 0.0
+
+async def get_questions_safe(content, profile, label="", count=QUESTION_COUNT, prompt=None,
+                             parser_cls=MCQStreamParser):
+    """Tries models in order of available rate budget, hedging slow ones"""
+    if prompt is None:
+        prompt = f"""
+    Extract {count} technical MCQs for {profile} from this text.
     Format: JSON Array only. Keys: question, options (array), answer.
     Text: {content[:8000]}
     """
+    messages = [
+        {"role": "system", "content": "Output valid JSON only."},
+        {"role": "user", "content": prompt}
+    ]
 
-    for model_id in FALLBACK_MODELS:
-        # Retry loop for 429 Rate Limits
-        for attempt in range(2): 
-            try:
-                print(f"   🤖 Trying {model_id} (Attempt {attempt+1})...")
-                completion = client.chat.completions.create(
-                    model=model_id,
-                    messages=[
-                        {"role": "system", "content": "Output valid JSON only."},
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                response_text = completion.choices[0].message.content
-                questions = extract_json(response_text)
-                
+    # A finished completion for this exact prompt costs nothing to replay
+    questions, model_id = llm_cache.get(FALLBACK_MODELS, messages)
+    if questions:
+        metrics.count("cache", cache="completion", result="hit")
+        print(f"   💾 {label}Reusing cached completion from {model_id}")
+        return questions, model_id
+    metrics.count("cache", cache="completion", result="miss")
+
+    attempts = {model_id: 0 for model_id in FALLBACK_MODELS}
+    # Healthiest models first; ones with an open circuit breaker are skipped
+    remaining = model_health.route(FALLBACK_MODELS)
+    if not remaining:
+        print(f"   ⚠️ {label}Every model is cooling down after repeated failures")
+        return None, None
+    in_flight = {}  # task -> model_id
+    hedges_used = 0
+    retry_hedge_in = None
+
+    def launch(model_id, hedge=False):
+        """Start an attempt on model_id; False if its breaker won't let one through now"""
+        if not model_health.begin(model_id):
+            # Another chunk's call is already probing this half-open model
+            print(f"   ⏭️  {label}{model_id} is being probed by another call, skipping")
+            remaining.remove(model_id)
+            return False
+        attempts[model_id] += 1
+        # Two attempts per model, same as before, for 429s and unparseable output
+        if attempts[model_id] >= 2:
+            remaining.remove(model_id)
+        kind = "Hedging with" if hedge else "Trying"
+        metrics.count("llm_attempts", model=model_id,
+                      kind="hedge" if hedge else "retry" if attempts[model_id] > 1 else "first")
+        print(f"   🤖 {label}{kind} {model_id} (Attempt {attempts[model_id]})...")
+        in_flight[asyncio.create_task(timed_attempt(model_id, messages, count, parser_cls))] = model_id
+        return True
+
+    try:
+        while True:
+            if not in_flight:
+                if not remaining:
+                    break
+                # Whichever model has budget first gets the request (ties keep list order)
+                with metrics.span("rate_wait", limiter="model"):
+                    model_id = await model_limiter.acquire_any(remaining)
+                if not launch(model_id):
+                    continue
+            idle = [m for m in remaining if m not in in_flight.values()]
+
+            timeout = None
+            if idle and hedges_used < MAX_HEDGES:
+                newest = list(in_flight.values())[-1]
+                timeout = retry_hedge_in if retry_hedge_in is not None else hedge_delay(newest)
+            done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # Still waiting past the percentile: race the next model that has budget now
+                model_id = model_limiter.try_acquire_any(idle)
+                if model_id:
+                    if launch(model_id, hedge=True):
+                        hedges_used += 1
+                        retry_hedge_in = None
+                else:
+                    retry_hedge_in = max(0.1, min(model_limiter.wait_time(m) for m in idle))
+                continue
+
+            for task in done:
+                model_id = in_flight.pop(task)
+                try:
+                    response_text, questions, usage, latency = task.result()
+                except Exception as e:
+                    err_str = str(e)
+                    status = getattr(e, "status_code", None)
+                    if status == 429 or "429" in err_str:
+                        metrics.count("rate_limited", limiter="model", model=model_id)
+                        model_health.record(model_id, "429")
+                        response = getattr(e, "response", None)
+                        delay = model_limiter.penalize(model_id, getattr(response, "headers", None))
+                        print(f"   ⏳ {label}Rate Limited on {model_id}. Backing off {delay:.0f}s...")
+                        continue
+                    if model_id in remaining:
+                        remaining.remove(model_id)
+                    if status == 404 or "404" in err_str:
+                        metrics.count("llm_errors", model=model_id, kind="404")
+                        model_health.record(model_id, "404")
+                        print(f"   ⚠️ {label}Model ID invalid, skipping...")
+                    else:
+                        metrics.count("llm_errors", model=model_id, kind="error")
+                        model_health.record(model_id, "error")
+                        print(f"   ⚠️ {label}Error: {e}")
+                    continue
+
+                model_limiter.reward(model_id)
+                tokens, cost = usage_cost(usage, messages, response_text)
+                model_health.record(model_id, "ok" if questions else "parse", latency, tokens, cost)
+                metrics.count("tokens", tokens, model=model_id)
+                spent = target_usage.get()
+                if spent is not None:
+                    spent["tokens"] += tokens
+                if not questions:
+                    metrics.count("llm_errors", model=model_id, kind="parse")
                 if questions:
+                    llm_cache.put(model_id, messages, response_text, questions, latency)
                     return questions, model_id
-            
-            except Exception as e:
-                err_str = str(e)
-                if "429" in err_str:
-                    print(f"   ⏳ Rate Limited. Waiting 20s...")
-                    time.sleep(20) # Cooldown for rate limit
-                    continue 
-                elif "404" in err_str:
-                    print(f"   ⚠️ Model ID invalid, skipping...")
-                    break 
-                else:
-                    print(f"   ⚠️ Error: {e}")
-                    break
-    
+    finally:
+        # First good answer wins; stop paying for the others
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        # Cancelled hedges never reported back; free their half-open probe slot
+        for model_id in in_flight.values():
+            model_health.stats(model_id).probing = False
+
     return None, None
 
+async def get_questions_for_page(content, profile, label, llm_slots):
+    """Map: one completion per chunk, run concurrently. Reduce: validate, merge and dedupe,
+    then re-ask only for the invalid or missing MCQs"""
+    chunks = split_chunks(content, CHUNK_TOKENS, MAX_CHUNKS)
+    # Ask each chunk for its share plus one spare to cover duplicates between chunks
+    per_chunk = QUESTION_COUNT if len(chunks) == 1 else math.ceil(QUESTION_COUNT / len(chunks)) + 1
+
+    async def ask(chunk):
+        with metrics.span("llm_queue"):
+            await llm_slots.acquire()
+        try:
+            return await get_questions_safe(chunk, profile, label, per_chunk)
+        finally:
+            llm_slots.release()
+
+    results = await asyncio.gather(*(ask(chunk) for chunk in chunks))
+    models = [model_id for qs, model_id in results if qs]
+    if not models:
+        return None, None
+    with metrics.span("validate"):
+        checked = [validate(qs) for qs, _ in results]
+    questions = merge_questions([valid for valid, _ in checked], QUESTION_COUNT)
+    invalid = [item for _, bad in checked for item in bad]
+    for _, reason in invalid:
+        metrics.count("mcq_invalid", reason=reason)
+    if len(chunks) > 1:
+        print(f"   🧩 {label}Merged {len(questions)} Qs from {len(models)}/{len(chunks)} chunks")
+
+    for _ in range(REPAIR_ROUNDS):
+        missing = QUESTION_COUNT - len(questions)
+        if missing <= 0:
+            break
+        # Source text from the chunk that yielded the fewest valid items
+        weakest = min(range(len(chunks)), key=lambda c: len(checked[c][0]))
+        prompt = repair_prompt(profile, invalid, missing, questions, chunks[weakest][:REPAIR_CHARS])
+        print(f"   🩹 {label}{len(invalid)} invalid, {missing} missing: asking for just those")
+        async with llm_slots:
+            fixed, model_id = await get_questions_safe(chunks[weakest], profile, label, missing, prompt=prompt)
+        valid, invalid = validate(fixed)
+        for _, reason in invalid:
+            metrics.count("mcq_invalid", reason=reason)
+        if not valid:
+            continue
+        before = len(questions)
+        questions = merge_questions([questions, valid], QUESTION_COUNT)
+        metrics.count("mcq_repaired", len(questions) - before)
+        models.append(model_id)
+
+    if not questions:
+        return None, None
+    return questions, max(set(models), key=models.count)
+
+async def get_packed_questions(content, target, label, run):
+    """Small page: share a packed completion; (None, None) sends it down the solo path"""
+    items, model_id, tokens = await run.packer.submit(target['company'], target['profile'], content)
+    spent = target_usage.get()
+    if spent is not None:
+        spent["tokens"] += tokens
+    if not items:
+        metrics.count("pack_fallbacks")
+        return None, None
+    valid, invalid = validate(items)
+    for _, reason in invalid:
+        metrics.count("mcq_invalid", reason=reason)
+    questions = merge_questions([valid], QUESTION_COUNT)
+    if len(questions) < MIN_QUESTIONS:
+        print(f"   📦 {label}Packed answer had only {len(questions)} valid Qs, retrying on its own")
+        metrics.count("pack_fallbacks")
+        return None, None
+    print(f"   📦 {label}Got {len(questions)} Qs from a packed request via {model_id}")
+    return questions, model_id
+
+# --embed: new questions are embedded in batches into a local similarity index (see embeddings.py)
+EMBED_BATCH = int(os.getenv("SCRAPER_EMBED_BATCH", "256"))
+EMBED_DIR = os.getenv("SCRAPER_EMBED_DIR") or os.path.join(CACHE_DIR, "embeddings")
+
 # 4. TARGETS
-targets = [
-    {"company": "Meta", "profile": "Frontend Engineer", "url": "https://www.geeksforgeeks.org/meta-interview-questions/"},
-    {"company": "Amazon", "profile": "SDE / Data Analyst", "url": "https://www.simplilearn.com/tutorials/data-analytics-tutorial/amazon-data-analyst-interview-questions"},
-    {"company": "Apple", "profile": "Software Engineer", "url": "https://www.geeksforgeeks.org/apple-interview-questions/"},
-    {"company": "Netflix", "profile": "Senior Software Engineer", "url": "https://www.simplilearn.com/netflix-interview-questions-article"},
-    {"company": "Google", "profile": "SDE Intern", "url": "https://www.geeksforgeeks.org/top-25-interview-questions-for-google-sde-internship/"},
-    {"company": "Microsoft", "profile": "Full Stack Engineer", "url": "https://www.geeksforgeeks.org/interview-experiences/microsofts-asked-interview-questions/"},
-    {"company": "Adobe", "profile": "Product Developer", "url": "https://www.geeksforgeeks.org/interview-experiences/adobe-interview-questions-set-1/"},
-    {"company": "Uber", "profile": "Backend Engineer", "url": "https://www.interviewbit.com/uber-interview-questions/"},
-    {"company": "McKinsey", "profile": "Business Analyst", "url": "https://careerinconsulting.com/mckinsey-case-interview/"},
-    {"company": "BCG", "profile": "Associate Consultant", "url": "https://caseinterview.com/bcg-interview-questions"},
-    {"company": "Goldman Sachs", "profile": "Operations Analyst", "url": "https://www.geeksforgeeks.org/interview-experiences/commonly-asked-questions-in-goldman-sachs-interviews/"},
-    {"company": "HUL", "profile": "Brand Manager", "url": "https://targetjobs.co.uk/careers-advice/interviews-and-assessment-centres/unilever-video-interview-questions-applying-work-placement"},
-    {"company": "P&G", "profile": "Supply Chain Manager", "url": "https://www.how2become.com/pg-interview-questions-and-answers/"},
-    {"company": "JPMorgan", "profile": "Financial Analyst", "url": "https://www.interviewbit.com/jp-morgan-interview-questions/"},
-    {"company": "Deloitte", "profile": "Risk Advisory", "url": "https://www.interviewbit.com/deloitte-interview-questions/"},
-    {"company": "Reliance", "profile": "Management Trainee", "url": "https://www.geeksforgeeks.org/interview-experiences/reliance-jio-interview-interview-experience-on-campus-online/"},
-    {"company": "TCS", "profile": "NQT / Ninja", "url": "https://takeuforward.org/interviews/tcs-nqt-coding-sheet-tcs-coding-questions"},
-    {"company": "Infosys", "profile": "System Engineer", "url": "https://www.geeksforgeeks.org/gfg-academy/top-infosys-interview-questions-and-answers/"},
-    {"company": "Accenture", "profile": "Application Analyst", "url": "https://www.geeksforgeeks.org/interview-experiences/accenture-interview-questions/"},
-    {"company": "Wipro", "profile": "Project Engineer", "url": "https://www.geeksforgeeks.org/interview-experiences/wipro-turbo-interview-experience-on-campus/"},
-    {"company": "Cognizant", "profile": "GenC Developer", "url": "https://www.geeksforgeeks.org/dsa/cognizant-sde-sheet-interview-questions-and-answers/"},
-    {"company": "Capgemini", "profile": "Senior Analyst", "url": "https://www.interviewbit.com/capgemini-interview-questions/"},
-    {"company": "SBI", "profile": "Probationary Officer (PO)", "url": "https://www.geeksforgeeks.org/ssc-banking/50-top-banking-interview-questions-and-answers-for-2024/"},
-    {"company": "IBM", "profile": "Associate Developer", "url": "https://www.geeksforgeeks.org/interview-experiences/ibm-interview-questions-and-answers-for-technical-profiles/"}
-]
-
-print(f"🚀 Starting INCREMENTAL Scraper...")
-
-for i, target in enumerate(targets):
-    print(f"\n[{i+1}/{len(targets)}] Checking: {target['company']}...")
-
-    # 🛑 CHECK DATABASE FIRST
-    # ✅ FIX: Explicit check "is not None" for PyMongo 4+ compatibility
-    if collection is not None:
-        existing = collection.find_one({
-            "company": target['company'], 
-            "profile": target['profile']
-        })
-        if existing and len(existing.get('questions', [])) > 0:
-            print(f"   ⏭️  Already exists in DB. Skipping.")
-            continue 
-
-    # If we reach here, it's a new company
-    print(f"   📥 Scraping new data...")
-    content = get_website_text(target['url'])
-    if not content:
-        continue
-
-    questions, used_model = get_questions_safe(content, target['profile'])
+# Read from targets.jsonl by default (see registry.py for the format, YAML and
+# the Mongo scrape_targets source), REGISTRY_BATCH targets at a time
+REGISTRY_BATCH = int(os.getenv("SCRAPER_REGISTRY_BATCH", "200"))
+
+class CrawlRun:
+    """Shared state for one crawl: HTTP pool, concurrency slots and DB helpers"""
+
+    def __init__(self, http, existing, writer, load_dedup, leases=None):
+        self.http = http
+        self.fetch_slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+        self.llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+        self.existing = existing  # {(company, profile): {count, scraped_at, content_hash}}
+        self.writer = writer
+        self.load_dedup = load_dedup  # builds the near-duplicate index over every stored question
+        self._dedup = None
+        self.leases = leases  # LeaseManager in --worker mode
+        self.packer = None  # PromptPacker in --pack mode
+        self.embeddings = None  # EmbeddingBatcher in --embed mode
+        self.prefilter = True  # off with --no-prefilter
+        self.budget = None  # TokenBudget
+        self.costs = {}  # (company, profile) -> estimated tokens reserved for it
+        # Workers only claim as many targets as they can work on, leaving the rest to others
+        self.target_slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def dedup_index(self):
+        """Built when the first target reaches dedup, so runs with nothing due never read every question"""
+        if self._dedup is None or (self._dedup.done() and self._dedup.exception()):
+            self._dedup = asyncio.ensure_future(asyncio.to_thread(self.load_dedup))
+        # Shielded: one waiting target being cancelled mustn't cancel the build for the others
+        return await asyncio.shield(self._dedup)
+
+async def process_target(i, target, run):
+    # Runs as its own task, so the usage dict set here collects only this target's tokens
+    key = (target['company'], target['profile'])
+    usage = {"tokens": 0}
+    target_usage.set(usage)
+    try:
+        await claim_and_run(i, target, run)
+    except Exception as e:
+        # One broken target (DB error, lost cache file, ...) must not take the rest of the crawl with it
+        metrics.count("target_errors", error=type(e).__name__)
+        print(f"❌ [{target['company']}] Unexpected error: {type(e).__name__}: {e}")
+        work_queue.fail(key, f"{type(e).__name__}: {e}"[:200])
+    finally:
+        run.budget.settle(run.costs.pop(key, 0), usage["tokens"])
+        if usage["tokens"]:
+            work_queue.record_tokens(key, usage["tokens"])
+
+async def claim_and_run(i, target, run):
+    if run.leases is None:
+        with metrics.span("target"):
+            await run_stages(i, target, run)
+        return
+
+    key = (target['company'], target['profile'])
+    async with run.target_slots:
+        if not await asyncio.to_thread(run.leases.claim, key):
+            print(f"   🔒 [{target['company']}] Claimed by another worker. Skipping.")
+            return
+        queued = False
+        try:
+            # The pre-crawl snapshot may be stale: another worker could have just written this target
+            from mongo_writer import existing_status
+
+            stored = (await asyncio.to_thread(existing_status, mongo_collection(), [target])).get(key)
+            run.existing.pop(key, None)
+            if stored:
+                run.existing[key] = stored
+            with metrics.span("target"):
+                queued = await run_stages(i, target, run)
+        finally:
+            # A queued upsert keeps its lease until the batch is flushed (see mark_written)
+            if not queued:
+                await asyncio.to_thread(run.leases.release, key)
+
+def lease_lost(run, key, label):
+    """True if our lease on key expired and was taken over: the new holder writes it, we mustn't"""
+    if run.leases is None or key in run.leases.held:
+        return False
+    print(f"   🔒 {label}Lease was taken over by another worker. Dropping this result.")
+    return True
+
+async def run_stages(i, target, run):
+    """Take one target through fetch -> extract -> validate -> write; True if an upsert was queued"""
+    label = f"[{target['company']}] "
+    key = (target['company'], target['profile'])
+    print(f"\n[{i+1}] Checking: {target['company']}...")
+
+    # 🛑 CHECK STATE FIRST: Mongo (one query per registry batch) plus our local checkpoints
+    stored = run.existing.get(key)
+    row = work_queue.get(key)
+    if not work_queue.is_due(row, stored, target["refresh_days"] * 24 * 3600):
+        print(f"   ⏭️  {label}Up to date in DB. Skipping.")
+        return
+
+    stage = row["state"] if row else "pending"
+    if stage == "written":
+        stage = "pending"  # stale: start over
+    if stage != "pending":
+        print(f"   ↩️  {label}Resuming after '{stage}'")
+    content = None
+    if stage == "fetched":
+        try:
+            content = await asyncio.to_thread(cached_text, row["content_hash"])
+        except FileNotFoundError:
+            # The page cache evicted (or lost) the body since the checkpoint: fetch it again
+            print(f"   ♻️  {label}Cached page is gone, fetching it again")
+            stage = "pending"
+
+    if stage == "pending":
+        work_queue.restart(key, target['url'])
+        async with run.fetch_slots:
+            print(f"   📥 {label}Scraping new data...")
+            content, content_hash = await get_website_text(run.http, target['url'])
+        if not content:
+            work_queue.fail(key, "fetch failed")
+            return
+        if stored and stored.get("content_hash") == content_hash and stored["count"] >= MIN_QUESTIONS:
+            # Page unchanged since the stored questions were made: no LLM call needed
+            print(f"   ✔️  {label}Page unchanged, refreshing timestamp only")
+            if lease_lost(run, key, label):
+                return
+            if run.writer is not None:
+                await run.writer.upsert(
+                    {"company": target['company'], "profile": target['profile']},
+                    {"scraped_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+                )
+            work_queue.advance(key, "written", content_hash=content_hash)
+            work_queue.succeed(key)
+            return run.writer is not None  # a queued upsert keeps its lease until flushed
+        work_queue.advance(key, "fetched", content_hash=content_hash)
+        row = work_queue.get(key)
+        stage = "fetched"
+
+    content_hash = row["content_hash"]
+    if stage == "fetched":
+        if run.budget.exhausted():
+            print(f"   ⏸️  {label}Token budget used up, leaving it for the next run")
+            return
+        kept = None
+        if run.prefilter:
+            with metrics.span("prefilter"):
+                content, kept = prefilter(content, PREFILTER_TOKENS)
+            metrics.count("prompt_tokens", kept["tokens_in"], text="page")
+            metrics.count("prompt_tokens", kept["tokens_out"], text="kept")
+        questions, used_model = None, None
+        if run.packer is not None and estimate_tokens(content) <= PACK_TARGET_TOKENS:
+            questions, used_model = await get_packed_questions(content, target, label, run)
+        if not questions:
+            questions, used_model = await get_questions_for_page(content, target['profile'], label, run.llm_slots)
+        if kept is not None:
+            found = len(questions or [])
+            metrics.count("prefilter_questions", found)
+            saved = 100 - 100 * kept["tokens_out"] // max(kept["tokens_in"], 1)
+            print(f"   🔎 {label}Pre-filter kept {kept['kept']}/{kept['passages']} passages, "
+                  f"{kept['tokens_in']} → {kept['tokens_out']} tokens ({saved}% saved), "
+                  f"yield {found} Qs ({found * 1000 / max(kept['tokens_out'], 1):.1f} per 1k tokens)")
+        if not questions:
+            print(f"❌ {label}Failed all retries.")
+            work_queue.fail(key, "no parseable questions")
+            return
+        work_queue.advance(key, "extracted", questions=questions, model_used=used_model)
+        row = work_queue.get(key)
+        stage = "extracted"
+
+    questions, used_model = row["questions"], row["model_used"]
+    if stage == "extracted":
+        found = len(questions)
+        dedup = await run.dedup_index()
+        questions = dedup.filter_new(questions, key)
+        if len(questions) < found:
+            print(f"   ♻️  {label}Dropped {found - len(questions)} near-duplicate Qs already stored")
+        if not questions:
+            work_queue.advance(key, "written", questions=[])
+            work_queue.fail(key, "all questions were duplicates")
+            return
+        work_queue.advance(key, "validated", questions=questions)
+
+    data_entry = {
+        "company": target['company'],
+        "profile": target['profile'],
+        "questions": questions,
+        "source": target['url'],
+        "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "model_used": used_model,
+        "content_hash": content_hash
+    }
+
+    if lease_lost(run, key, label):
+        return
+    if run.embeddings is not None:
+        await run.embeddings.add(target['company'], target['profile'], questions)
 
-    if questions:
-        data_entry = {
-            "company": target['company'],
-            "profile": target['profile'],
-            "questions": questions,
-            "source": target['url'],
-            "scraped_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "model_used": used_model
-        }
-        
-        # ✅ FIX: Explicit check here too
-        if collection is not None:
-            collection.update_one(
-                {"company": target['company'], "profile": target['profile']},
-                {"$set": data_entry},
-                upsert=True
-            )
-            print(f"✅ Saved {len(questions)} Qs via {used_model}")
+    # ✅ FIX: Explicit check "is not None" for PyMongo 4+ compatibility
+    if run.writer is not None:
+        # Marked 'written' in the work queue once the batch is flushed
+        await run.writer.upsert({"company": target['company'], "profile": target['profile']}, data_entry)
+        print(f"✅ {label}Queued {len(questions)} Qs via {used_model}")
+        if len(questions) < MIN_QUESTIONS:
+            work_queue.fail(key, f"only {len(questions)} questions")
         else:
-            print("⚠️ DB not connected. Skipping save.")
-        
-        print("   💤 Cooling down (10s)...")
-        time.sleep(10)
+            work_queue.succeed(key)
+        return True
     else:
-        print(f"❌ Failed all retries.")
+        print(f"⚠️ {label}DB not connected. Skipping save.")
+
+def mark_written(filters, leases=None):
+    keys = [(f["company"], f["profile"]) for f in filters]
+    for key in keys:
+        row = work_queue.get(key)
+        if row and row["state"] == "validated":
+            work_queue.advance(key, "written")
+    if leases is not None:
+        leases.release_many(keys)
+
+def due_targets(batch, run):
+    """The targets of one registry batch that need work, as (target, value, cost),
+    most value per estimated token first (see scheduler.py).
+
+    Local checkpoints rule out recently written targets without touching
+    Mongo; the rest get one $in status query for the whole batch.
+    """
+    rows = {}
+
+    def due(target, stored=None):
+        key = (target['company'], target['profile'])
+        if key not in rows:
+            rows[key] = work_queue.get(key)
+        return work_queue.is_due(rows[key], stored, target["refresh_days"] * 24 * 3600)
+
+    candidates = [t for t in batch if due(t)]
+    stored = {}
+    collection = mongo_collection()
+    if candidates and collection is not None:
+        from mongo_writer import existing_status
+
+        with metrics.span("db_read", query="status"):
+            stored = existing_status(collection, candidates)
+        candidates = [t for t in candidates if due(t, stored.get((t['company'], t['profile'])))]
+        if run.budget.limited:
+            run.existing.update(stored)  # due targets of every batch are ranked together
+        else:
+            run.existing = stored  # only the current batch is kept
+    prompt_tokens = PREFILTER_TOKENS if run.prefilter else CHUNK_TOKENS * MAX_CHUNKS
+    now = time.time()
+    scored = []
+    for target in candidates:
+        key = (target['company'], target['profile'])
+        cost = estimate_cost(rows[key], page_cache.page_size(target['url']), prompt_tokens,
+                             QUESTION_COUNT, CHUNK_TOKENS)
+        scored.append((target, value(target, rows[key], stored.get(key), MIN_QUESTIONS, now), cost))
+    return rank(scored)
+
+async def run_due(due, start, run):
+    """Admit ranked (target, value, cost) entries while the budget lasts and crawl them; returns how many ran"""
+    admitted = []
+    for target, _, cost in due:
+        if not run.budget.admit(cost):
+            continue  # a cheaper target further down may still fit
+        run.costs[(target['company'], target['profile'])] = cost
+        admitted.append(target)
+    if run.leases is not None:
+        random.shuffle(admitted)  # workers start in different places, so fewer claims collide
+    await asyncio.gather(*(process_target(start + i, target, run) for i, target in enumerate(admitted)))
+    return len(admitted)
+
+async def run_workers(count, args):
+    """Coordinator: start `count` --worker processes of this script and wait for all of them"""
+    argv = [sys.executable, os.path.abspath(__file__), "--worker"]
+    if args.no_cache:
+        argv.append("--no-cache")
+    if args.refresh:
+        argv.append("--refresh")
+    if args.extractor:
+        argv += ["--extractor", args.extractor]
+    if args.pack:
+        argv.append("--pack")
+    if args.no_prefilter:
+        argv.append("--no-prefilter")
+    if args.embed:
+        # The index is a single-writer file; embed what the workers stored afterwards
+        print("⚠️  --embed is not passed to workers; run scripts/embeddings.py build when they finish")
+    argv += ["--targets", args.targets]
+    if args.shard:
+        argv += ["--shard", args.shard]
+    for company in args.company:
+        argv += ["--company", company]
+    for host in args.host:
+        argv += ["--host", host]
+    if args.min_priority is not None:
+        argv += ["--min-priority", str(args.min_priority)]
+    if args.token_budget:
+        argv += ["--token-budget", str(max(1, args.token_budget // count))]  # split between workers
+    if args.daily_tokens:
+        argv += ["--daily-tokens", str(args.daily_tokens)]  # one ledger per machine, shared
+    if args.trace:
+        argv += ["--trace", args.trace]  # line-buffered appends, so workers can share the file
+    if args.profile:
+        argv += ["--profile", args.profile, "--profiler", args.profiler, "--profile-dir", args.profile_dir]
+    print(f"🚀 Starting {count} scraper workers...")
+    procs = []
+    for n in range(count):
+        metrics_file = []
+        if args.metrics_file:
+            root, ext = os.path.splitext(args.metrics_file)
+            metrics_file = ["--metrics-file", f"{root}-worker{n}{ext}"]
+        procs.append(await asyncio.create_subprocess_exec(*argv, *metrics_file))
+    codes = await asyncio.gather(*(p.wait() for p in procs))
+    failed = [p.pid for p, code in zip(procs, codes) if code != 0]
+    if failed:
+        print(f"❌ Workers {failed} exited with errors; their leases expire after {LEASE_SECONDS:.0f}s")
+    print(f"\n🎉 All {count} workers finished!")
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape interview pages into MCQs")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the completion cache")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached completions but store new ones")
+    parser.add_argument("--extractor", choices=["auto", *BACKENDS], help="HTML to text backend")
+    parser.add_argument("--worker", action="store_true",
+                        help="claim targets through Mongo leases so several processes/machines can share the list")
+    parser.add_argument("--workers", type=int, default=0, help="start this many --worker processes and wait")
+    parser.add_argument("--targets", default=os.getenv("SCRAPER_TARGETS", DEFAULT_TARGETS),
+                        help="targets .jsonl/.yaml file, or 'mongo' for the scrape_targets collection")
+    parser.add_argument("--shard", help="i/N: only crawl targets in shard i of N (stable hash of company/profile)")
+    parser.add_argument("--company", action="append", default=[], help="only these companies (repeatable)")
+    parser.add_argument("--host", action="append", default=[], help="only targets on these hosts (repeatable)")
+    parser.add_argument("--min-priority", type=int, help="skip targets below this priority")
+    parser.add_argument("--pack", action="store_true", default=os.getenv("SCRAPER_PACK") == "1",
+                        help="pack several small pages into one completion")
+    parser.add_argument("--no-prefilter", action="store_true", default=os.getenv("SCRAPER_PREFILTER") == "0",
+                        help="send whole pages to the model instead of their most question-like passages")
+    parser.add_argument("--token-budget", type=int, default=RUN_TOKENS,
+                        help="stop admitting targets once this run's estimated tokens would pass this")
+    parser.add_argument("--daily-tokens", type=int, default=DAILY_TOKENS,
+                        help="daily token allowance shared by runs on this machine; unspent tokens carry over")
+    parser.add_argument("--embed", action="store_true", default=os.getenv("SCRAPER_EMBED") == "1",
+                        help="embed new questions into the local similarity index (needs numpy)")
+    parser.add_argument("--trace", default=os.getenv("SCRAPER_TRACE"), help="append a JSON line per timed span here")
+    parser.add_argument("--metrics-file", default=os.getenv("SCRAPER_METRICS_FILE"),
+                        help="write Prometheus text-format metrics here at the end of the run")
+    parser.add_argument("--profile", default=os.getenv("SCRAPER_PROFILE", ""),
+                        help="comma-separated spans to profile, e.g. clean,json_parse")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], default="cprofile")
+    parser.add_argument("--profile-dir", default=os.path.join(CACHE_DIR, "profiles"))
+    args = parser.parse_args(argv)
+    try:
+        shard = parse_shard(args.shard) if args.shard else None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers:
+        await run_workers(args.workers, args)
+        return
+    if not openrouter_key:
+        print("❌ Error: OPENROUTER_API_KEY not found in .env")
+        exit()
+    collection = mongo_collection()
+    if args.worker and collection is None:
+        print("❌ Error: --worker needs MONGODB_URI for target leases")
+        exit()
+    global extractor_name, extract_text, FALLBACK_MODELS
+    FALLBACK_MODELS = await load_models()
+    if args.extractor:
+        extractor_name, extract_text = get_extractor(args.extractor)
+    llm_cache.enabled = not args.no_cache
+    llm_cache.refresh = args.refresh
+    global metrics
+    metrics = Metrics(args.trace, [p for p in args.profile.split(",") if p], args.profile_dir, args.profiler)
+
+    print(f"🚀 Starting INCREMENTAL Scraper... (extractor: {extractor_name})")
+
+    existing, writer, leases = {}, None, None
+    load_dedup = lambda: DedupIndex(DEDUP_THRESHOLD)
+    if args.targets == "mongo" and collection is None:
+        print("❌ Error: --targets mongo needs MONGODB_URI")
+        exit()
+    registry = Registry(
+        args.targets, mongo_db()["scrape_targets"] if collection is not None else None,
+        Filters(args.company, args.host, args.min_priority, shard), REFRESH_DAYS,
+    )
+    if args.worker:
+        from leases import LeaseManager
+
+        leases = LeaseManager(mongo_db()["scrape_leases"], ttl=LEASE_SECONDS)
+        await asyncio.to_thread(leases.ensure_indexes)
+        print(f"   🔒 Worker {leases.worker_id} (lease {LEASE_SECONDS:.0f}s)")
+    if collection is not None:
+        from mongo_writer import BufferedWriter, ensure_indexes
+
+        # Target status comes from one $in query per registry batch (see due_targets)
+        await asyncio.to_thread(ensure_indexes, collection)
+        writer = BufferedWriter(collection, MONGO_BATCH_SIZE, MONGO_FLUSH_SECONDS,
+                                on_written=lambda filters: mark_written(filters, leases), metrics=metrics)
+
+        def load_dedup():
+            with metrics.span("db_read", query="dedup_index"):
+                dedup = build_index(collection.find({}, {"company": 1, "profile": 1, "questions": 1}), DEDUP_THRESHOLD)
+            print(f"   ♻️  Dedup index holds {len(dedup)} stored questions")
+            return dedup
+
+    import httpx
+
+    # One pooled client for every page so connections to the same host are reused
+    limits = httpx.Limits(max_connections=FETCH_CONCURRENCY, max_keepalive_connections=FETCH_CONCURRENCY)
+
+    budget = TokenBudget(os.path.join(CACHE_DIR, "token_budget.db"), args.daily_tokens, args.token_budget,
+                         BUDGET_CARRY_DAYS)
+
+    heartbeat = None
+    if leases is not None:
+        heartbeat = asyncio.create_task(leases.heartbeat_loop())
+
+    scheduled = 0
+    try:
+        async with httpx.AsyncClient(headers=HEADERS, limits=limits, timeout=15, follow_redirects=True) as http:
+            run = CrawlRun(http, existing, writer, load_dedup, leases)
+            run.prefilter = not args.no_prefilter
+            run.budget = budget
+            if args.pack:
+                async def ask_packed(prompt, count):
+                    # The send task copied the context of whichever target flushed the pack:
+                    # count into a fresh dict so the packer can share the tokens out instead
+                    usage = {"tokens": 0}
+                    target_usage.set(usage)
+                    async with run.llm_slots:
+                        questions, model_id = await get_questions_safe("", "", "[packed] ", count, prompt=prompt,
+                                                                       parser_cls=KeyedMCQStreamParser)
+                    return questions, model_id, usage["tokens"]
+                run.packer = PromptPacker(ask_packed, QUESTION_COUNT, PACK_TOKENS, PACK_MAX_TARGETS, PACK_DELAY)
+            if args.embed:
+                from embeddings import EmbeddingBatcher, get_embedder, open_index
+
+                embedder = get_embedder()
+                run.embeddings = EmbeddingBatcher(open_index(EMBED_DIR, embedder), embedder, EMBED_BATCH)
+            # The registry is streamed: only one batch of targets is in memory at a time,
+            # except under a token budget, where the due ones of every batch compete for it
+            batches = registry.batches(REGISTRY_BATCH)
+            waiting = []
+            while True:
+                batch = await asyncio.to_thread(next, batches, None)
+                if batch is None:
+                    break
+                due = await asyncio.to_thread(due_targets, batch, run)
+                if run.budget.limited:
+                    waiting.extend(due)
+                else:
+                    scheduled += await run_due(due, scheduled, run)
+            if waiting:
+                scheduled += await run_due(rank(waiting), scheduled, run)
+            if run.packer is not None:
+                await run.packer.close()
+            if run.embeddings is not None:
+                with metrics.span("embed"):
+                    await run.embeddings.flush()
+    finally:
+        if writer is not None:
+            try:
+                await writer.close()
+            except Exception as e:
+                # The rest of the cleanup (leases, model health, metrics) must still run
+                print(f"❌ Final MongoDB flush failed, {e.__class__.__name__}: {e}")
+        if leases is not None:
+            heartbeat.cancel()
+            await asyncio.to_thread(leases.release_all)
+        # Keep what we learned about each model even if the run was interrupted
+        model_health.save()
+        if args.metrics_file:
+            metrics.write_prometheus(args.metrics_file)
+        metrics.close()
+
+    print(f"   📚 Targets: {registry.read} read, {registry.matched} matched, {scheduled} due")
+    if args.pack:
+        print(f"   📦 Packing: {run.packer.packed} targets in {run.packer.requests} requests, "
+              f"{metrics.counter('pack_fallbacks')} retried on their own")
+    allowance, spent_today = budget.today()
+    print(f"   💰 Tokens: {budget.run_spent} this run ({budget.admitted} targets admitted, "
+          f"{budget.deferred} deferred), {spent_today} today"
+          + (f" of {allowance:.0f} ({budget.carried:.0f} carried over)" if allowance is not None else ""))
+    if not args.no_prefilter:
+        page_tokens = metrics.counter("prompt_tokens", text="page")
+        kept_tokens = metrics.counter("prompt_tokens", text="kept")
+        found = metrics.counter("prefilter_questions")
+        print(f"   🔎 Pre-filter: {page_tokens} → {kept_tokens} page tokens "
+              f"({100 - 100 * kept_tokens // max(page_tokens, 1)}% saved), "
+              f"{found} Qs ({found * 1000 / max(kept_tokens, 1):.1f} per 1k tokens)")
+    if args.embed:
+        print(f"   🧭 Embeddings: {run.embeddings.embedded} new questions in {run.embeddings.batches} batches, "
+              f"{len(run.embeddings.index)} indexed")
+    print(f"   📦 Page cache: {page_cache.hits} revalidated, {page_cache.misses} downloaded")
+    print(f"   💾 Completion cache: {llm_cache.hits} hits, {llm_cache.misses} misses")
+    print(f"   📋 Work queue: {work_queue.summary()}")
+    if collection is not None:
+        round_trips = _mongo[0]
+        print(f"   🗄️  MongoDB round-trips: {round_trips.total} {round_trips.commands}")
+    if leases is not None:
+        print(f"   🔒 Leases: {leases.claimed} claimed, {leases.lost} lost to expiry")
+    print("   🩺 Model health:")
+    for row in model_health.summary():
+        print(f"      {row['model']:<45} {row['state']:<9} p50={row['p50']} p95={row['p95']} "
+              f"ok={row['ok_rate']} parse_fail={row['parse_fail_rate']} 429={row['rate_429']} tokens={row['tokens']}")
+    print("   ⏱️  Stage timings (s):")
+    print(f"      {'span':<12}{'calls':>7}{'total':>10}{'p50':>9}{'p95':>9}{'max':>9}{'errors':>8}")
+    for row in metrics.summary():
+        print(f"      {row['span']:<12}{row['calls']:>7}{row['total']:>10}{row['p50']:>9}{row['p95']:>9}"
+              f"{row['max']:>9}{row['errors']:>8}")
+    print(f"   🔢 LLM attempts: {metrics.counter('llm_attempts', kind='first')} first, "
+          f"{metrics.counter('llm_attempts', kind='retry')} retries, {metrics.counter('llm_attempts', kind='hedge')} hedges; "
+          f"429s: {metrics.counter('rate_limited')}; tokens: {metrics.counter('tokens')}; "
+          f"invalid MCQs: {metrics.counter('mcq_invalid')}, repaired: {metrics.counter('mcq_repaired')}")
+    print("\n🎉 Scraper Finished!")
+
+if __name__ == "__main__":
+    asyncio.run(main())
 
-print("\n🎉 Scraper Finished!")
 
 # import os
 # import json
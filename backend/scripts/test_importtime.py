@@ -0,0 +1,35 @@
+"""Cold-start regression test: scraper and check_models must import within budget.
+
+Each module is imported in a fresh interpreter under -X importtime (see
+cli.import_ms); SCRAPER_IMPORT_BUDGET_MS sets the budget.
+
+    python -m unittest scripts/test_importtime.py    (or: python -m pytest scripts)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cli import IMPORT_BUDGET_MS, import_ms
+
+
+class ImportTimeTest(unittest.TestCase):
+    def check(self, module):
+        try:
+            ms = import_ms(module)
+        except RuntimeError as e:
+            if "ModuleNotFoundError" in str(e):
+                self.skipTest(f"{module} needs a dependency that isn't installed: {e}")
+            raise
+        self.assertLessEqual(ms, IMPORT_BUDGET_MS, f"importing {module} took {ms:.1f} ms")
+
+    def test_scraper(self):
+        self.check("scraper")
+
+    def test_check_models(self):
+        self.check("check_models")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+"""Offline tests for json_stream.py's packed (keyed) answers.
+
+    python -m unittest scripts/test_json_stream.py    (or: python -m pytest scripts)
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from json_stream import KeyedMCQStreamParser, MCQStreamParser
+
+
+def mcq(n):
+    return {"question": f"Q{n}?", "options": ["a", "b"], "answer": "a"}
+
+
+def parse(text, chunk=None):
+    parser = KeyedMCQStreamParser()
+    if chunk is None:
+        return parser.feed(text)
+    return [item for i in range(0, len(text), chunk) for item in parser.feed(text[i:i + chunk])]
+
+
+class KeyedParserTest(unittest.TestCase):
+    def test_items_keep_their_section(self):
+        text = json.dumps({"T1": [mcq(1), mcq(2)], "T2": [mcq(3)]})
+        for chunk in (None, 1, 7):
+            items = parse(text, chunk)
+            self.assertEqual([(i["_key"], i["question"]) for i in items],
+                             [("T1", "Q1?"), ("T1", "Q2?"), ("T2", "Q3?")])
+
+    def test_empty_section_does_not_take_the_next_ones_items(self):
+        for answer in ({"T1": [], "T2": [mcq(1)]}, {"T1": [1, "x"], "T2": [mcq(1)], "T3": []}):
+            text = json.dumps(answer)
+            for chunk in (None, 1, 5):
+                items = parse(text, chunk)
+                self.assertEqual([(i["_key"], i["question"]) for i in items], [("T2", "Q1?")])
+
+    def test_unkeyed_parser_still_skips_brackets_in_prose(self):
+        text = "Here are [15] questions: " + json.dumps([mcq(1)])
+        self.assertEqual([i["question"] for i in MCQStreamParser().feed(text)], ["Q1?"])
+
+
+if __name__ == "__main__":
+    unittest.main()
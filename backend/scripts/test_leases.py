@@ -0,0 +1,106 @@
+"""Offline tests for leases.py on a mongomock collection (two workers, injected clock).
+
+    python -m unittest scripts/test_leases.py    (or: python -m pytest scripts)
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import mongomock
+    from pymongo.errors import AutoReconnect
+
+    from leases import LeaseManager
+    from mongo_writer import existing_status
+except ImportError:  # pymongo / mongomock not installed
+    mongomock = None
+
+KEY = ("Acme", "SDE")
+
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+@unittest.skipIf(mongomock is None, "needs pymongo and mongomock")
+class LeaseTest(unittest.TestCase):
+    def setUp(self):
+        self.collection = mongomock.MongoClient()["brainwave"]["scrape_leases"]
+        self.clock = Clock()
+        self.a = LeaseManager(self.collection, "worker-a", ttl=60, clock=self.clock)
+        self.b = LeaseManager(self.collection, "worker-b", ttl=60, clock=self.clock)
+        self.a.ensure_indexes()
+
+    def test_only_one_worker_holds_a_live_lease(self):
+        self.assertTrue(self.a.claim(KEY))
+        self.assertFalse(self.b.claim(KEY))
+        self.assertTrue(self.a.claim(KEY))  # re-claiming our own lease is fine
+        self.assertEqual(self.a.held, {KEY})
+        self.assertEqual(self.b.held, set())
+
+    def test_heartbeat_keeps_the_lease_alive(self):
+        self.assertTrue(self.a.claim(KEY))
+        self.clock.advance(50)
+        self.a.heartbeat()
+        self.clock.advance(50)
+        self.assertFalse(self.b.claim(KEY))
+
+    def test_expired_lease_is_taken_over_and_the_old_holder_notices(self):
+        self.assertTrue(self.a.claim(KEY))
+        self.clock.advance(61)
+        self.assertTrue(self.b.claim(KEY))
+        self.a.heartbeat()
+        self.assertEqual(self.a.held, set())
+        self.assertEqual(self.a.lost, 1)
+        self.a.release(KEY)  # must not free worker-b's lease
+        self.assertFalse(self.a.claim(KEY))
+
+    def test_release_and_reclaim(self):
+        self.assertTrue(self.a.claim(KEY))
+        self.a.release(KEY)
+        self.assertTrue(self.b.claim(KEY))
+        self.b.release_all()
+        self.assertEqual(self.b.held, set())
+        self.assertTrue(self.a.claim(KEY))
+
+    def test_failing_heartbeats_give_up_every_lease(self):
+        class Flaky:
+            def update_one(self, *args, **kwargs):
+                raise AutoReconnect("connection reset")
+
+        async def scenario():
+            leases = LeaseManager(Flaky(), "worker-a", ttl=0.3)
+            leases.held.add(KEY)
+            loop = asyncio.create_task(leases.heartbeat_loop())
+            await asyncio.sleep(0.5)
+            self.assertFalse(loop.done())  # errors don't end the loop
+            loop.cancel()
+            return leases
+
+        leases = asyncio.run(scenario())
+        self.assertEqual(leases.held, set())
+        self.assertEqual(leases.lost, 1)
+
+    def test_existing_status_counts_questions_without_size_projection(self):
+        questions = self.collection.database["mocktest_data"]
+        questions.insert_one({"company": "Acme", "profile": "SDE", "questions": [{}, {}, {}], "scraped_at": "x"})
+        questions.insert_one({"company": "Acme", "profile": "QA"})
+        status = existing_status(questions, [{"company": "Acme"}])
+        self.assertEqual(status[KEY]["count"], 3)
+        self.assertEqual(status[("Acme", "QA")]["count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""Offline tests for ratelimit.py, driven by FakeClock (no real waiting).
+
+    python -m unittest scripts/test_ratelimit.py    (or: python -m pytest scripts)
+"""
+
+import asyncio
+import os
+import sys
+import unittest
+from email.utils import formatdate
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ratelimit import FakeClock, RateLimiter, parse_retry_after
+
+
+class TopRng:
+    """Always draws the top of the jitter range, so delays are exact"""
+
+    def uniform(self, low, high):
+        return high
+
+
+async def settle():
+    # Let woken tasks run up to their next await
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class AcquireAnyTest(unittest.TestCase):
+    def test_hands_off_to_the_key_with_budget(self):
+        async def scenario():
+            clock = FakeClock()
+            limiter = RateLimiter(60, clock=clock)  # one token per second, burst 1
+            self.assertEqual(await limiter.acquire_any(["a", "b"]), "a")
+            self.assertEqual(await limiter.acquire_any(["a", "b"]), "b")
+
+            # Both empty: the waiter sleeps until the first refill, then ties go to the earlier key
+            waiter = asyncio.create_task(limiter.acquire_any(["a", "b"]))
+            await settle()
+            clock.advance(0.5)
+            await settle()
+            self.assertFalse(waiter.done())
+            clock.advance(0.5)
+            await settle()
+            self.assertEqual(waiter.result(), "a")
+            self.assertEqual(clock.sleeps[0], 1.0)
+
+            # A key in backoff is passed over while another one refills first
+            clock.advance(1.0)
+            limiter.penalize("a", {"Retry-After": "30"})
+            self.assertEqual(await limiter.acquire_any(["a", "b"]), "b")
+            waiter = asyncio.create_task(limiter.acquire_any(["a", "b"]))
+            await settle()
+            clock.advance(1.0)
+            await settle()
+            self.assertEqual(waiter.result(), "b")
+
+        asyncio.run(scenario())
+
+    def test_try_acquire_any_does_not_wait(self):
+        limiter = RateLimiter(60, clock=FakeClock())
+        self.assertEqual(limiter.try_acquire_any(["a"]), "a")
+        self.assertIsNone(limiter.try_acquire_any(["a"]))
+
+
+class RetryAfterTest(unittest.TestCase):
+    wall = 1_700_000_000.0
+
+    def test_retry_after_seconds_and_date(self):
+        self.assertEqual(parse_retry_after({"Retry-After": "7"}, self.wall), 7.0)
+        date = formatdate(self.wall + 30, usegmt=True)
+        self.assertAlmostEqual(parse_retry_after({"retry-after": date}, self.wall), 30.0)
+
+    def test_ratelimit_reset_only_when_nothing_remains(self):
+        reset_ms = str(int((self.wall + 12) * 1000))
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset_ms}
+        self.assertAlmostEqual(parse_retry_after(headers, self.wall), 12.0)
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(self.wall + 5)}
+        self.assertAlmostEqual(parse_retry_after(headers, self.wall), 5.0)
+        headers = {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "1m30s"}
+        self.assertEqual(parse_retry_after(headers, self.wall), 90.0)
+        headers = {"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": reset_ms}
+        self.assertIsNone(parse_retry_after(headers, self.wall))
+        self.assertIsNone(parse_retry_after({}, self.wall))
+
+    def test_penalize_honors_headers_on_the_fake_wall_clock(self):
+        clock = FakeClock()
+        limiter = RateLimiter(60, clock=clock)
+        reset_ms = str(int((clock.wall() + 20) * 1000))
+        delay = limiter.penalize("m", {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset_ms})
+        self.assertAlmostEqual(delay, 20.0)
+        self.assertAlmostEqual(limiter.wait_time("m"), 20.0)
+        clock.advance(20)
+        self.assertEqual(limiter.wait_time("m"), 0)
+
+
+class BackoffTest(unittest.TestCase):
+    def test_backoff_doubles_up_to_the_cap_and_resets(self):
+        limiter = RateLimiter(60, clock=FakeClock(), base_backoff=2.0, max_backoff=20.0, rng=TopRng())
+        delays = [limiter.penalize("m") for _ in range(6)]
+        self.assertEqual(delays, [2.0, 4.0, 8.0, 16.0, 20.0, 20.0])
+        limiter.reward("m")
+        self.assertEqual(limiter.penalize("m"), 2.0)
+
+    def test_jitter_stays_in_the_upper_half_of_the_step(self):
+        limiter = RateLimiter(60, clock=FakeClock(), base_backoff=2.0)
+        for failures in range(5):
+            limiter.failures["m"] = failures
+            step = 2.0 * 2 ** failures
+            for _ in range(50):
+                self.assertTrue(step / 2 <= limiter.backoff_delay("m") <= step)
+
+
+if __name__ == "__main__":
+    unittest.main()
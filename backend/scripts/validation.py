@@ -0,0 +1,165 @@
+"""Validate and locally repair MCQs before they are stored.
+
+An item is kept when it has a non-empty question, 2-6 distinct non-empty
+options and an answer that is one of those options. Cheap fixes are made
+in place instead of rejecting the item:
+
+- numbers and other scalars in options/answer become strings;
+- an answer given as a letter ("B", "(b)", "2.") or with an "A) " style
+  prefix is mapped to the option text (a digit only when the options aren't
+  numbers themselves: "3" among "10", "20", "30" is a wrong answer, not the
+  third option);
+- an answer that differs from an option only in case or spacing is
+  replaced by that option.
+
+The shape check uses a msgspec Struct when msgspec is installed (compiled
+conversion straight from the parsed dicts) and plain Python otherwise;
+both give the same result. Whatever still fails is returned with a reason
+so the scraper can ask a model to fix just those items (repair_prompt).
+"""
+
+import json
+import re
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+MIN_OPTIONS = 2
+MAX_OPTIONS = 6
+
+_LETTER = re.compile(r"^\(?([A-Fa-f]|[1-6])\)?[.):]?$")        # "B", "(b)", "2."
+_PREFIX = re.compile(r"^\(?([A-Fa-f]|[1-6])[.):]\s+")          # "B) text", "2. text"
+_NUMBER = re.compile(r"^[-+]?\d+(?:[.,]\d+)*%?$")
+
+if msgspec is not None:
+    class MCQ(msgspec.Struct):
+        question: str
+        options: list
+        answer: object = None
+
+
+def _text(value):
+    if value is None or isinstance(value, (dict, list)):
+        return ""
+    return " ".join(str(value).split())
+
+
+def _key(text):
+    return _text(text).lower()
+
+
+def _shape(item):
+    """(question, options, answer) or a reason string"""
+    if msgspec is not None:
+        try:
+            mcq = msgspec.convert(item, MCQ, strict=False)
+        except msgspec.ValidationError as e:
+            return "missing_options" if "options" in str(e) else "missing_question"
+        question, options, answer = mcq.question, mcq.options, mcq.answer
+    else:
+        if not isinstance(item, dict) or not isinstance(item.get("question"), str):
+            return "missing_question"
+        if not isinstance(item.get("options"), list):
+            return "missing_options"
+        question, options, answer = item["question"], item["options"], item.get("answer")
+    return question, options, answer
+
+
+def _position(token, options):
+    if token.isalpha():
+        index = "abcdef".find(token.lower())
+    elif any(_NUMBER.match(o) for o in options):
+        return None  # among numeric options a digit is a value, not a position
+    else:
+        index = int(token) - 1
+    return index if 0 <= index < len(options) else None
+
+
+def _match_answer(answer, options):
+    # A bare integer is ambiguous (value? 0- or 1-based index?), so it only matches by value
+    text = _text(answer)
+    if not text:
+        return None
+    keys = [_key(o) for o in options]
+    if text.lower() in keys:
+        return options[keys.index(text.lower())]
+    if not isinstance(answer, str):
+        return None
+    letter = _LETTER.match(text)
+    if letter:
+        index = _position(letter.group(1), options)
+        return None if index is None else options[index]
+    prefixed = _PREFIX.match(text)
+    if prefixed:
+        rest = text[prefixed.end():].lower()
+        if rest in keys:
+            return options[keys.index(rest)]
+        index = _position(prefixed.group(1), options)
+        return None if index is None else options[index]
+    return None
+
+
+def check(item):
+    """(repaired item, None) if item is usable, else (None, reason)"""
+    shape = _shape(item)
+    if isinstance(shape, str):
+        return None, shape
+    question, options, answer = shape
+    question = _text(question)
+    if not question:
+        return None, "missing_question"
+    options = [_text(o) for o in options]
+    # Options all written as "A) text" lose the prefix, so the answer can be matched by text
+    if options and all(_PREFIX.match(o) for o in options):
+        options = [_PREFIX.sub("", o, count=1) for o in options]
+    cleaned = []
+    for option in options:
+        if option and _key(option) not in {_key(o) for o in cleaned}:
+            cleaned.append(option)
+    if not MIN_OPTIONS <= len(cleaned) <= MAX_OPTIONS:
+        return None, "bad_options"
+    matched = _match_answer(answer, cleaned)
+    if matched is None:
+        return None, "answer_not_in_options"
+    repaired = dict(item)
+    repaired.update(question=question, options=cleaned, answer=matched)
+    return repaired, None
+
+
+def validate(items):
+    """Split items into (valid, invalid); invalid is a list of (item, reason)"""
+    valid, invalid = [], []
+    for item in items or []:
+        fixed, reason = check(item)
+        if fixed is None:
+            invalid.append((item, reason))
+        else:
+            valid.append(fixed)
+    return valid, invalid
+
+
+def repair_prompt(profile, invalid, missing, valid, excerpt, max_item_chars=600):
+    """A short prompt asking only for `missing` replacement MCQs.
+
+    Broken items are quoted (trimmed) with their problem so the model can fix
+    them; the stems of valid items are listed so new ones don't repeat them.
+    """
+    broken = []
+    for item, reason in invalid[:missing]:
+        raw = json.dumps(item, ensure_ascii=False)
+        broken.append(f"- {reason}: {raw[:max_item_chars]}")
+    lines = [
+        f"Return a JSON array of exactly {missing} technical MCQs for {profile}.",
+        "Keys: question, options (array of 4 strings), answer (copied exactly from options).",
+    ]
+    if broken:
+        lines.append("Fix these invalid items first (reason: item):")
+        lines.extend(broken)
+    if valid:
+        lines.append("Do not repeat these questions:")
+        lines.extend(f"- {_text(q['question'])[:160]}" for q in valid)
+    if excerpt:
+        lines.append(f"Source text: {excerpt}")
+    return "\n".join(lines)
@@ -0,0 +1,148 @@
+"""Checkpointed per-target crawl state for the scraper.
+
+Every (company, profile) has a row in a local SQLite file recording the last
+stage it completed:
+
+    pending -> fetched -> extracted -> validated -> written
+
+along with what that stage produced (page content hash, raw questions, the
+validated questions and the model used), a retry count and the last error.
+After a crash each target resumes from its last completed stage instead of
+re-downloading the page and paying for the completion again.
+
+is_due() decides whether a finished target should run again: complete results
+are left alone until they are older than the refresh interval, partial or
+failed ones are retried up to max_retries times per interval.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+STAGES = ("pending", "fetched", "extracted", "validated", "written")
+
+
+def parse_scraped_at(value):
+    """scraped_at is stored as local '%Y-%m-%d %H:%M:%S'; returns epoch seconds or None"""
+    if not value:
+        return None
+    try:
+        return time.mktime(time.strptime(value, "%Y-%m-%d %H:%M:%S"))
+    except (TypeError, ValueError):
+        return None
+
+
+class WorkQueue:
+    def __init__(self, path, refresh_seconds=30 * 24 * 3600, min_questions=10, max_retries=3, clock=time.time):
+        self.refresh_seconds = refresh_seconds
+        self.min_questions = min_questions
+        self.max_retries = max_retries
+        self.clock = clock
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS targets (
+                company TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                url TEXT,
+                state TEXT NOT NULL DEFAULT 'pending',
+                content_hash TEXT,
+                questions TEXT,
+                model_used TEXT,
+                retries INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL,
+                written_at REAL,
+                tokens_used INTEGER,
+                PRIMARY KEY (company, profile)
+            );
+        """)
+        columns = {r["name"] for r in self.db.execute("PRAGMA table_info(targets)")}
+        if "tokens_used" not in columns:  # queues made before token budgets
+            self.db.execute("ALTER TABLE targets ADD COLUMN tokens_used INTEGER")
+            self.db.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self.db.execute(
+                "SELECT * FROM targets WHERE company = ? AND profile = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+        row = dict(row)
+        row["questions"] = json.loads(row["questions"]) if row["questions"] else None
+        return row
+
+    def _upsert(self, key, **fields):
+        fields["updated_at"] = self.clock()
+        columns = ", ".join(fields)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in fields)
+        with self._lock:
+            self.db.execute(
+                f"INSERT INTO targets (company, profile, {columns}) VALUES (?, ?, {', '.join('?' * len(fields))})"
+                f" ON CONFLICT (company, profile) DO UPDATE SET {updates}",
+                (*key, *fields.values()),
+            )
+            self.db.commit()
+
+    def advance(self, key, state, **fields):
+        """Record that key finished `state`, with whatever that stage produced"""
+        if "questions" in fields:
+            fields["questions"] = json.dumps(fields["questions"])
+        if state == "written":
+            fields["written_at"] = self.clock()
+        self._upsert(key, state=state, **fields)
+
+    def restart(self, key, url=None):
+        """Start a due target over from the beginning, keeping its retry count"""
+        self._upsert(key, state="pending", url=url, questions=None, last_error=None)
+
+    def fail(self, key, error):
+        with self._lock:
+            self.db.execute(
+                "UPDATE targets SET retries = retries + 1, last_error = ?, updated_at = ?"
+                " WHERE company = ? AND profile = ?",
+                (error, self.clock(), *key),
+            )
+            self.db.commit()
+
+    def succeed(self, key):
+        with self._lock:
+            self.db.execute(
+                "UPDATE targets SET retries = 0, last_error = NULL WHERE company = ? AND profile = ?", key
+            )
+            self.db.commit()
+
+    def record_tokens(self, key, tokens):
+        """Tokens the target's last crawl used, for the scheduler's cost estimate"""
+        self._upsert(key, tokens_used=int(tokens))
+
+    def is_due(self, row, stored=None, refresh_seconds=None):
+        """stored is what Mongo holds for the target: {'count', 'scraped_at'} or None.
+        refresh_seconds overrides the queue's interval for targets with their own"""
+        refresh = self.refresh_seconds if refresh_seconds is None else refresh_seconds
+        now = self.clock()
+        # Checked before resuming: a page that keeps failing mid-way would otherwise pay for completions every run
+        if row and row["retries"] >= self.max_retries and now - (row["updated_at"] or 0) < refresh:
+            return False  # gave up for this refresh interval
+        if row and row["state"] in ("fetched", "extracted", "validated"):
+            return True  # crashed or stopped mid-way: resume
+        written = [t for t in (parse_scraped_at((stored or {}).get("scraped_at")),
+                               row and row["written_at"]) if t]
+        if not written:
+            return True
+        count = (stored or {}).get("count")
+        if count is None:
+            count = len((row or {}).get("questions") or [])
+        complete = count >= self.min_questions
+        return not complete or now - max(written) >= refresh
+
+    def summary(self):
+        with self._lock:
+            rows = self.db.execute("SELECT state, COUNT(*) FROM targets GROUP BY state").fetchall()
+        return {state: count for state, count in rows}